@@ -0,0 +1,242 @@
+# Times each stage of the tracker on synthetic sets and records wall time and
+# peak Python memory as JSON, e.g.
+#
+#   python benchmarks/bench_tracker.py --sizes 300 3000 -o bench.json
+#   python benchmarks/bench_tracker.py --sizes 300 3000 --compare bench.json
+#
+# Synthetic images are generated once per size under --workdir and reused.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tracker_core import CardCatalog, CollectionStore, CompletionStats  # noqa: E402
+from tracker_core.search import SearchIndex, parse_search  # noqa: E402
+
+DEFAULT_SIZES = (300, 3000, 30000)
+CARD_SIZE = (301, 420)
+
+
+def generate_set(workdir, size):
+    # A set directory with `size` small card images plus its card_sets.json
+    set_dir = os.path.join(workdir, f"set_{size}")
+    cards_dir = os.path.join(set_dir, 'cards')
+    if not os.path.exists(os.path.join(set_dir, 'card_sets.json')):
+        from PIL import Image
+
+        shutil.rmtree(set_dir, ignore_errors=True)
+        os.makedirs(cards_dir)
+        for number in range(1, size + 1):
+            color = (number * 37 % 256, number * 91 % 256, number * 53 % 256, 255)
+            Image.new('RGBA', CARD_SIZE, color).save(os.path.join(cards_dir, f"{number}-card{number}-301x420.png"))
+
+        sets = {
+            'synthetic': {
+                'name': f"Synthetic {size}",
+                'directory': 'cards',
+                # Each pack gets its own sixth of the set; the rest is shared by all packs
+                'packs': {
+                    f"pack{i}": {'name': f"Pack {i}", 'button': 'assets/button1.png',
+                                 'cards': list(range(i * size // 6 + 1, (i + 1) * size // 6 + 1))}
+                    for i in range(3)
+                },
+                'rarities': {
+                    'diamond': [[1, size * 8 // 10]],
+                    'one_star': [[size * 8 // 10 + 1, size * 9 // 10]],
+                    'two_star': [[size * 9 // 10 + 1, size * 98 // 100]],
+                    'crown': [[size * 98 // 100 + 1, size]],
+                },
+                'pull_rates': [
+                    {'diamond': 1.0}, {'diamond': 1.0}, {'diamond': 1.0},
+                    {'diamond': 0.96666, 'one_star': 0.02572, 'two_star': 0.00722, 'crown': 0.0004},
+                    {'diamond': 0.86664, 'one_star': 0.10288, 'two_star': 0.02888, 'crown': 0.0016},
+                ],
+            }
+        }
+        with open(os.path.join(set_dir, 'card_sets.json'), 'w', encoding='utf-8') as f:
+            json.dump(sets, f)
+    return set_dir
+
+
+def measure(function, repeat=1):
+    # Best wall time over `repeat` runs, then one more run under tracemalloc for peak memory
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def bench_size(workdir, size, decode_sample, seed):
+    set_dir = generate_set(workdir, size)
+    sets_path = os.path.join(set_dir, 'card_sets.json')
+    index_path = os.path.join(set_dir, '.card_index.json')
+    results = {}
+
+    # Directory scan, filename parsing and sort, with and without a persisted index
+    def scan_cold():
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        CardCatalog(sets_path, index_path)
+
+    results['scan_sort_cold'] = measure(scan_cold)
+    CardCatalog(sets_path, index_path)
+    results['scan_sort_indexed'] = measure(lambda: CardCatalog(sets_path, index_path), repeat=3)
+    catalog = CardCatalog(sets_path, index_path)
+    cards = catalog.cards_in('synthetic')
+
+    # Image decode into the thumbnail cache, then reads from the cache
+    try:
+        from thumbnail_cache import ThumbnailCache
+    except ImportError:
+        ThumbnailCache = None
+    if ThumbnailCache is not None:
+        sample = [card.image_path for card in cards[:decode_sample]]
+        cache_dir = os.path.join(set_dir, '.thumbnail_cache')
+
+        def decode_cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cache = ThumbnailCache(cache_dir)
+            for image_path in sample:
+                cache.read(image_path)
+
+        def decode_cached():
+            cache = ThumbnailCache(cache_dir)
+            for image_path in sample:
+                with cache.open(image_path):
+                    pass
+
+        results['decode_cold'] = dict(measure(decode_cold), cards=len(sample))
+        results['decode_cached'] = dict(measure(decode_cached, repeat=3), cards=len(sample))
+
+    # Grid data as handed to the RecycleView; views themselves are a fixed pool
+    rng = random.Random(seed)
+    owned = {card.card_id for card in cards if rng.random() < 0.5}
+    results['build_grid'] = measure(lambda: [
+        {'card_id': card.card_id, 'image_path': card.image_path, 'card_name': card.name, 'owned': card.card_id in owned}
+        for card in cards
+    ], repeat=3)
+
+    # View switches and search: the index is built once per catalog change, then every
+    # keystroke or pack click is a query; typing is replayed one character at a time
+    results['search_build'] = measure(lambda: SearchIndex(cards, owned), repeat=3)
+    index = SearchIndex(cards, owned)
+    results['view_switch'] = measure(lambda: index.query(pack_id='pack1'), repeat=5)
+    typed = 'card12* #1-500'
+    queries = [typed[:end] for end in range(1, len(typed) + 1)] + ['car', 'rd1', '#10 #20 #30']
+
+    def search_queries():
+        index._name_cache.clear()
+        for text in queries:
+            terms, ranges = parse_search(text)
+            index.query(terms, ranges, owned=False, pack_id='pack1')
+
+    results['search_query'] = dict(measure(search_queries, repeat=3), queries=len(queries))
+
+    # Completion: full recompute vs one incremental toggle per card
+    stats = CompletionStats(catalog, owned)
+    results['completion_recompute'] = measure(lambda: stats.recompute(owned), repeat=3)
+
+    def toggle_all():
+        for card in cards:
+            stats.update(card.card_id, card.card_id not in owned)
+        stats.recompute(owned)
+
+    results['completion_toggle_each'] = dict(measure(toggle_all), toggles=len(cards))
+
+    # Save (journal appends and compaction) and load
+    collection_path = os.path.join(set_dir, 'collection.json')
+
+    def save():
+        for path in (collection_path, os.path.splitext(collection_path)[0] + '.journal'):
+            if os.path.exists(path):
+                os.remove(path)
+        store = CollectionStore(collection_path, compact_every=len(cards) + 1)
+        for card_id in owned:
+            store.set_owned(card_id, True)
+        store.compact()
+        store.close()
+
+    results['save_state'] = dict(measure(save), changes=len(owned))
+    results['load_state'] = measure(lambda: CollectionStore(collection_path, read_only=True), repeat=3)
+
+    try:
+        from tracker_core import PackRecommender
+        recommender = PackRecommender(catalog, 'synthetic')
+        results['recommend_expected'] = measure(lambda: recommender.expected_new_cards(owned), repeat=5)
+    except ImportError:
+        pass
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Prints every stage next to the baseline and flags the ones that got slower than
+    # `threshold` times it (ignoring sub-millisecond noise); returns True if any did
+    regressed = False
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            old = baseline.get('results', {}).get(size, {}).get(stage)
+            if not old or not old['seconds']:
+                continue
+            ratio = result['seconds'] / old['seconds']
+            slower = ratio > threshold and result['seconds'] - old['seconds'] > 0.001
+            marker = '  REGRESSION' if slower else ''
+            regressed = regressed or bool(marker)
+            print(f"{size:>6} {stage:<24} {old['seconds'] * 1000:10.2f} ms -> {result['seconds'] * 1000:10.2f} ms"
+                  f"  x{ratio:.2f}{marker}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tracker on synthetic card sets.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--workdir', default=os.path.join(ROOT, '.bench'), help="where synthetic sets are kept")
+    parser.add_argument('--decode-sample', type=int, default=300, help="images decoded per size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write results as JSON")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = bench_size(args.workdir, size, args.decode_sample, args.seed)
+        for stage, result in results[str(size)].items():
+            print(f"{size:>6} {stage:<24} {result['seconds'] * 1000:10.2f} ms  "
+                  f"peak {result['peak_bytes'] / 1024:10.1f} KiB")
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            return 1 if compare(results, json.load(f), args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from kivy.clock import Clock
+from thumbnail_cache import ThumbnailCache
+
+# Each worker process opens its own handle on the shared cache directory
+_worker_cache = None
+
+
+def _init_worker(cache_dir, max_bytes):
+    global _worker_cache
+    _worker_cache = ThumbnailCache(cache_dir, max_bytes)
+
+
+def _decode(image_path, level):
+    return _worker_cache.read(image_path, level)
+
+
+class AsyncCardLoader:
+    # Decodes card images on a worker pool and hands them back to the UI thread
+    # a few per frame. Starting a new view cancels everything still pending.
+    def __init__(self, thumbnail_cache, mode='thread', max_workers=None, batch_size=10):
+        if mode == 'process':
+            self.executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(thumbnail_cache.cache_dir, thumbnail_cache.max_bytes),
+            )
+            self._decode = _decode
+        else:
+            # Threads share the app's cache, so its size budget counts every write
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            self._decode = thumbnail_cache.read
+        self.batch_size = batch_size
+        self.time_to_first_card = None
+        self.total_load_time = None
+        self.on_idle = None  # Called once the first screen of the current view is loaded
+
+        self._generation = 0
+        self._start_time = time.perf_counter()
+        self._pending = {}  # image_path -> (future, [callbacks])
+        self._results = deque()  # Filled by worker callbacks, drained on the UI thread
+        self._event = None
+
+    def start(self):
+        # Begin a new view: drop pending work and reset the timing counters
+        self.cancel()
+        self._start_time = time.perf_counter()
+        self.time_to_first_card = None
+        self.total_load_time = None
+
+    def request(self, image_path, level, callback):
+        # callback(image_path, size, pixels) runs on the UI thread; size and
+        # pixels are None if decoding failed
+        if image_path in self._pending:
+            self._pending[image_path][1].append(callback)
+            return
+
+        future = self.executor.submit(self._decode, image_path, level)
+        self._pending[image_path] = (future, [callback])
+        future.add_done_callback(partial(self._collect, self._generation, image_path))
+        if self._event is None:
+            self._event = Clock.schedule_interval(self._drain, 0)
+
+    def _collect(self, generation, image_path, future):
+        # Runs on a worker thread; results from a cancelled view are dropped
+        if future.cancelled() or generation != self._generation:
+            return
+        try:
+            size, pixels = future.result()
+        except Exception as e:
+            print(f"Error loading image {image_path}: {e}")
+            size, pixels = None, None
+        self._results.append((generation, image_path, size, pixels))
+
+    def _drain(self, dt):
+        delivered = 0
+        while self._results and delivered < self.batch_size:
+            generation, image_path, size, pixels = self._results.popleft()
+            if generation != self._generation or image_path not in self._pending:
+                continue
+            _, callbacks = self._pending.pop(image_path)
+            for callback in callbacks:
+                callback(image_path, size, pixels)
+            delivered += 1
+
+        if delivered and self.time_to_first_card is None:
+            self.time_to_first_card = time.perf_counter() - self._start_time
+
+        if not self._pending:
+            self._event.cancel()
+            self._event = None
+            if self.total_load_time is None:
+                self._finish()
+
+    def check_idle(self, dt=None):
+        # Schedule after the view's data is set: a view served entirely from the
+        # texture cache never queues a decode, so _drain would not report it
+        if not self._pending and self._event is None and self.total_load_time is None:
+            self._finish()
+
+    def _finish(self):
+        self.total_load_time = time.perf_counter() - self._start_time
+        if self.time_to_first_card is None:
+            self.time_to_first_card = self.total_load_time
+        if self.on_idle is not None:
+            self.on_idle()
+
+    def cancel(self):
+        self._generation += 1
+        for future, _ in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._results.clear()
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,74 @@
 import os
-import re
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
 from kivy.uix.image import Image
 from kivy.uix.checkbox import CheckBox
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.popup import Popup
+from kivy.uix.spinner import Spinner
+from kivy.uix.textinput import TextInput
 from kivy.uix.image import Image as LogoImage
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recyclegridlayout import RecycleGridLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.graphics.texture import Texture
 from kivy.core.window import Window
-from PIL import Image as PILImage
+from kivy.clock import Clock
+from thumbnail_cache import ThumbnailCache, TextureLRU, THUMBNAIL_LEVELS
+from card_loader import AsyncCardLoader
+from tracker_core import CardCatalog, CollectionStore, CompletionStats
+from tracker_core.instrumentation import phase, log, summary
+from tracker_core.collection import move_aside
+from tracker_core.search import SearchIndex, parse_search
+
+OWNED_FILTERS = {'All cards': None, 'Owned': True, 'Missing': False}
+ANY_RARITY = 'Any rarity'
+
+class CardView(RecycleDataViewBehavior, BoxLayout):
+    # One recycled card in the grid; all state lives in the RecycleView data
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        self.index = None
+        self.image_path = None
+        self.refreshing = False
+
+        self.image = Image(size_hint=(None, None))
+        self.add_widget(self.image)
+
+        checkbox_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height='50dp', spacing=0)
+        self.checkbox = CheckBox(size_hint=(None, None), width='50dp', height='50dp')  # You can reduce the size if needed
+        self.checkbox.bind(active=self.on_checkbox_active)
+        self.label = Label(size_hint_y=None, height='50dp', color=(0, 0, 0, 1), size_hint_x=None, width=200)  # Adjust width as needed
+        checkbox_layout.add_widget(self.checkbox)
+        checkbox_layout.add_widget(self.label)
+        self.add_widget(checkbox_layout)
+
+    def refresh_view_attrs(self, rv, index, data):
+        app = App.get_running_app()
+        self.index = index
+        self.image.size = THUMBNAIL_LEVELS[app.thumbnail_level]
+        self.label.text = data['card_name']
+
+        # Don't report the recycled checkbox state back as a user toggle
+        self.refreshing = True
+        self.checkbox.active = data['owned']
+        self.refreshing = False
+
+        # Also re-request when a previous load was cancelled before it arrived
+        if data['image_path'] != self.image_path or self.image.texture is None:
+            self.image_path = data['image_path']
+            self.image.texture = None
+            app.request_texture(self, self.image_path)
+
+    def set_texture(self, image_path, texture):
+        # Ignore textures that arrive after this view was recycled for another card
+        if image_path == self.image_path:
+            self.image.texture = texture
+
+    def on_checkbox_active(self, checkbox, value):
+        if not self.refreshing and self.index is not None:
+            App.get_running_app().set_owned(self.index, value)
 
 class PokeSetTrackerApp(App):
     def build(self):
@@ -21,16 +77,51 @@ class PokeSetTrackerApp(App):
         Window.size = (1920, 1080)
         Window.borderless = False  # Windowed mode with borders
 
-        self.card_vars = []  # Store ownership variables
-        self.image_paths = []  # Store image paths
+        self.set_cards = []  # Card data for every card of the set: card ID, image path, name and owned flag
+        self.cards = []  # The cards of set_cards currently shown in the grid
+        self.pack_id = None  # Pack shown, or None for the whole set
         self.completion_percentage = 0
 
-        # Dictionary to define subsets of cards to load for buttons 2, 3, and 4
-        self.subsets = {
-            'button2': ['1', '2', '3'],
-            'button3': ['4', '5', '6'],
-            'button4': ['10']
-        }
+        # Card index for every set and pack, refreshed when an image directory changes
+        self.catalog = CardCatalog()
+        self.set_id = next(iter(self.catalog.sets))
+
+        # Owned cards by card ID; toggles go to a journal, Save compacts it
+        try:
+            self.collection = CollectionStore()
+            recovered = []
+        except (OSError, ValueError) as e:
+            # A corrupt or newer-version save must not keep the app from starting
+            recovered = move_aside('collection.json')
+            self.collection = CollectionStore()
+            moved = '\n'.join(recovered)
+            popup = Popup(title="Error", content=Label(text=f"Error loading state: {e}\nMoved aside to:\n{moved}"),
+                          size_hint=(0.5, 0.5))
+            popup.open()
+        if not recovered and not self.collection.exists() and os.path.exists('data.txt'):
+            # Migrate the old positional format, which followed the full set view
+            self.collection.import_legacy('data.txt', [card.card_id for card in self.catalog.cards_in(self.set_id)])
+
+        # Owned/total counters per set and pack, updated in O(1) per toggle
+        self.stats = CompletionStats(self.catalog, self.collection.owned)
+        self.stats.listeners.append(self.update_completion)
+
+        # Expected new cards per pack, re-evaluated whenever the counters change
+        self.recommender = self.make_recommender()
+        self.stats.listeners.append(self.update_recommendation)
+
+        # Card data and search index for the set, rebuilt only when the catalog changes
+        self.build_set_cards()
+
+        # Decoded card pixels are cached on disk, uploaded textures in memory
+        self.thumbnail_level = 'large'
+        self.thumbnail_cache = ThumbnailCache()
+        self.texture_cache = TextureLRU()
+
+        # Decode images off the main thread and deliver them a batch per frame
+        self.async_loading = True
+        self.card_loader = AsyncCardLoader(self.thumbnail_cache)
+        self.card_loader.on_idle = self.on_cards_loaded
 
         # Main layout with vertical orientation
         main_layout = BoxLayout(orientation='vertical')
@@ -45,28 +136,40 @@ class PokeSetTrackerApp(App):
         toolbar = BoxLayout(size_hint_y=None, height='100dp', spacing=10, padding=[10, 20, 10, 20])
         main_layout.add_widget(toolbar)
 
-        # Add four buttons with images from assets
-        button_names = ['button1', 'button2', 'button3', 'button4']
-        for name in button_names:
-            btn = Button(
-                background_normal=f'assets/{name}.png',
-                size_hint=(None, None), 
-                size=(151, 71)  # Set button size to 151x71 pixels
-            )
-            if name == 'button1':
-                btn.bind(on_release=lambda instance: self.load_images_from_directory())  # Load all cards
-            elif name == 'button2':
-                btn.bind(on_release=lambda instance: self.load_subset('button2'))
-            elif name == 'button3':
-                btn.bind(on_release=lambda instance: self.load_subset('button3'))
-            elif name == 'button4':
-                btn.bind(on_release=lambda instance: self.load_subset('button4'))
-
+        # One button for the whole set, then one per pack as defined in the catalog
+        btn = Button(background_normal='assets/button1.png', size_hint=(None, None), size=(151, 71))  # Set button size to 151x71 pixels
+        btn.bind(on_release=lambda instance: self.load_cards())  # Load all cards
+        toolbar.add_widget(btn)
+        for pack_id, pack in self.catalog.packs(self.set_id).items():
+            btn = Button(background_normal=pack['button'], size_hint=(None, None), size=(151, 71))
+            btn.bind(on_release=lambda instance, pack_id=pack_id: self.load_subset(pack_id))
             toolbar.add_widget(btn)
 
-        # Scrollable area for card images, with 10 columns to make images more visible
-        self.scroll_view = ScrollView(size_hint=(1, 1))
-        self.cards_layout = GridLayout(cols=5, spacing=30, size_hint_y=None)
+        # Search and filters narrow the loaded cards without reloading anything
+        self.search_input = TextInput(
+            hint_text="Search: name, name*, #12 or #10-50", multiline=False,
+            size_hint=(None, None), size=(400, 50),
+        )
+        self.search_input.bind(text=lambda instance, value: self.apply_filters())
+        toolbar.add_widget(self.search_input)
+
+        self.owned_filter = Spinner(text='All cards', values=list(OWNED_FILTERS), size_hint=(None, None), size=(151, 50))
+        self.owned_filter.bind(text=lambda instance, value: self.apply_filters())
+        toolbar.add_widget(self.owned_filter)
+
+        rarities = [ANY_RARITY] + list(self.catalog.sets[self.set_id].get('rarities', {}))
+        self.rarity_filter = Spinner(text=ANY_RARITY, values=rarities, size_hint=(None, None), size=(151, 50))
+        self.rarity_filter.bind(text=lambda instance, value: self.apply_filters())
+        toolbar.add_widget(self.rarity_filter)
+
+        # Scrollable, virtualized grid of cards: only the visible views exist as widgets
+        card_width, card_height = THUMBNAIL_LEVELS[self.thumbnail_level]
+        self.scroll_view = RecycleView(size_hint=(1, 1), viewclass=CardView)
+        self.cards_layout = RecycleGridLayout(
+            cols=5, spacing=30, size_hint_y=None,
+            default_size=(card_width, card_height + 50),  # Add height for checkbox and label
+            default_size_hint=(None, None),
+        )
         self.cards_layout.bind(minimum_height=self.cards_layout.setter('height'))
         self.scroll_view.add_widget(self.cards_layout)
         main_layout.add_widget(self.scroll_view)
@@ -82,119 +185,184 @@ class PokeSetTrackerApp(App):
         save_btn.bind(on_release=self.save_state)
         bottom_toolbar.add_widget(save_btn)
 
+        mark_all_btn = Button(text='Mark All', size_hint=(None, None), size=(151, 71))
+        mark_all_btn.bind(on_release=lambda instance: self.set_all_owned(True))
+        bottom_toolbar.add_widget(mark_all_btn)
+
+        clear_btn = Button(text='Clear', size_hint=(None, None), size=(151, 71))
+        clear_btn.bind(on_release=lambda instance: self.set_all_owned(False))
+        bottom_toolbar.add_widget(clear_btn)
+
         quit_btn = Button(text='Quit', size_hint=(None, None), size=(151, 71))
         quit_btn.bind(on_release=self.stop)
         bottom_toolbar.add_widget(quit_btn)
 
-        # Completion percentage label
+        # Completion percentage label, for the whole set and each pack
         self.completion_label = Label(text="Completion: 0%", size_hint_y=None, height='50dp', color=(0, 0, 0, 1))
         bottom_toolbar.add_widget(self.completion_label)
 
         main_layout.add_widget(bottom_toolbar)
 
-        # Load images from the specified directory
-        self.load_images_from_directory()
+        # Optimal pack recommendation below the completion
+        self.recommendation_label = Label(text="", size_hint_y=None, height='40dp', color=(0, 0, 0, 1))
+        if self.recommender is not None:
+            main_layout.add_widget(self.recommendation_label)
 
-        return main_layout
+        self.update_completion()
+        self.update_recommendation()
 
-    def load_images_from_directory(self, subset_filters=None):
-        # Clear previous images
-        self.cards_layout.clear_widgets()
-        self.image_paths.clear()
-        self.card_vars.clear()
+        # Load every card of the set
+        self.load_cards()
 
-        # Define the directory to load images from
-        directory = 'genetic_apex_cards'
+        return main_layout
 
-        # Check if the directory exists
-        if not os.path.exists(directory):
+    def load_cards(self, pack_id=None):
+        # Pick up cards added to or removed from the image directory since the last view
+        with phase('catalog_refresh'):
+            changed = self.catalog.refresh()
+        if changed:
+            self.recommender = self.make_recommender()
+            self.stats.reset(self.catalog, self.collection.owned)
+            self.build_set_cards()
+        for directory in self.catalog.missing_directories:
             popup = Popup(title="Error", content=Label(text=f"Directory '{directory}' not found."), size_hint=(0.5, 0.5))
             popup.open()
-            return
-
-        # Loop through the directory and load images
-        for filename in os.listdir(directory):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):  # Check for image files
-                if subset_filters:
-                    # Load only if the filename starts with one of the subset filters
-                    if any(filename.startswith(f"{filter}-") for filter in subset_filters):
-                        self.image_paths.append(os.path.join(directory, filename))
-                else:
-                    self.image_paths.append(os.path.join(directory, filename))
-
-        # Sort images using custom sort
-        self.image_paths.sort(key=self.custom_sort_key)
-
-        # Load and display all images
-        self.load_all_images()
-
-    def custom_sort_key(self, image_path):
-        base_name = os.path.basename(image_path)
-        match = re.match(r"(\d+)-?(.*)", base_name)
-        if match:
-            number = int(match.group(1))
-            name = match.group(2).lower()
-            return (number, name)
-        return (float('inf'), base_name)
-
-    def load_all_images(self):
-        for image_path in self.image_paths:
-            img_texture = self.load_image(image_path)
-            if img_texture is not None:
-                # Create a card for the image
-                card_layout = BoxLayout(orientation='vertical', size_hint_y=None, height=img_texture.height + 50)  # Add height for checkbox and label
 
-                img = Image(texture=img_texture, size_hint=(None, None), size=(img_texture.width, img_texture.height))
-                card_layout.add_widget(img)
-
-                checkbox_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height='50dp', spacing=0)  
-                card_var = CheckBox(size_hint=(None, None), width='50dp', height='50dp')  # You can reduce the size if needed
-                card_var.bind(active=self.update_completion)
-
-                filename = os.path.basename(image_path).split('.')[0]
-                card_name = re.sub(r'^\d+-|-\d+x\d+', '', filename).capitalize()
-                card_label = Label(text=card_name, size_hint_y=None, height='50dp', color=(0, 0, 0, 1), size_hint_x=None, width=200)  # Adjust width as needed
-
-                checkbox_layout.add_widget(card_var)
-                checkbox_layout.add_widget(card_label)
-
-                card_layout.add_widget(checkbox_layout)
-
-                self.cards_layout.add_widget(card_layout)
-                self.card_vars.append(card_var)
+        self.pack_id = pack_id
+        self.apply_filters()
+
+    def build_set_cards(self):
+        with phase('build_set_cards'):
+            cards = self.catalog.cards_in(self.set_id)
+            self.set_cards = [
+                {'card_id': card.card_id, 'image_path': card.image_path, 'card_name': card.name,
+                 'owned': card.card_id in self.collection}
+                for card in cards
+            ]
+            self.search_index = SearchIndex(cards, self.collection.owned)
+
+    def apply_filters(self):
+        # Re-filter the loaded card data; textures are requested by the views as they become visible
+        terms, ranges = parse_search(self.search_input.text)
+        rarity = self.rarity_filter.text
+
+        with phase('apply_filters', query=self.search_input.text):
+            positions = self.search_index.query(
+                terms, ranges,
+                owned=OWNED_FILTERS[self.owned_filter.text], pack_id=self.pack_id,
+                rarity=None if rarity == ANY_RARITY else rarity,
+            )
+            self.cards = [self.set_cards[position] for position in positions]
+
+        # Stop loading textures for cards that are no longer shown
+        self.card_loader.start()
+        self.scroll_view.data = self.cards
+        self.scroll_view.scroll_y = 1
+        # Runs after the views have requested their textures, so cached views are timed too
+        Clock.schedule_once(self.card_loader.check_idle)
+
+    def request_texture(self, view, image_path):
+        texture = self.texture_cache.get((image_path, self.thumbnail_level))
+        if texture is not None:
+            view.set_texture(image_path, texture)
+        elif self.async_loading:
+            self.card_loader.request(
+                image_path, self.thumbnail_level,
+                lambda path, size, pixels: self.on_texture_decoded(view, path, size, pixels),
+            )
+        else:
+            view.set_texture(image_path, self.load_image(image_path))
 
-        self.update_completion()  # Update completion after loading images
+    def on_texture_decoded(self, view, image_path, size, pixels):
+        if size is None:
+            return
+        texture = self.texture_cache.get((image_path, self.thumbnail_level))
+        if texture is None:
+            texture = self.create_texture(image_path, size, pixels)
+        view.set_texture(image_path, texture)
+
+    def on_cards_loaded(self):
+        loader = self.card_loader
+        log(f"loaded {len(self.cards)} cards: first card after {loader.time_to_first_card:.3f}s, "
+            f"visible cards after {loader.total_load_time:.3f}s")
+        log(f"textures: {len(self.texture_cache)} cached, {self.texture_cache.total_bytes / (1024 * 1024):.1f} MB")
+
+    def set_owned(self, index, value):
+        card = self.cards[index]
+        card['owned'] = value
+        with phase('toggle'):
+            if self.collection.set_owned(card['card_id'], value):
+                self.search_index.set_owned(card['card_id'], value)
+                self.stats.update(card['card_id'], value)
+
+    def set_all_owned(self, value):
+        # Mark or clear every card in the current view, notifying the stats once
+        with self.stats.suspended():
+            changed = self.collection.set_owned_many([card['card_id'] for card in self.cards], value)
+            for card_id in changed:
+                self.search_index.set_owned(card_id, value)
+                self.stats.update(card_id, value)
+        for card in self.cards:
+            card['owned'] = value
+        self.scroll_view.refresh_from_data()
 
     def load_image(self, image_path):
-        try:
-            img = PILImage.open(image_path)
-            img_data = img.tobytes()
-            texture = Texture.create(size=img.size, colorfmt='rgba')
-            texture.blit_buffer(img_data, colorfmt='rgba', bufferfmt='ubyte')
-            texture.flip_vertical()  # Flip the texture to fix flipped images
+        key = (image_path, self.thumbnail_level)
+        texture = self.texture_cache.get(key)
+        if texture is not None:
             return texture
+
+        try:
+            with self.thumbnail_cache.open(image_path, self.thumbnail_level) as (size, pixels):
+                return self.create_texture(image_path, size, pixels)
         except Exception as e:
             print(f"Error loading image {image_path}: {e}")
             return None
 
-    def load_subset(self, button_key):
-        subset_filters = self.subsets.get(button_key, [])
-        self.load_images_from_directory(subset_filters)
+    def create_texture(self, image_path, size, pixels):
+        with phase('create_texture'):
+            texture = Texture.create(size=size, colorfmt='rgba')
+            texture.blit_buffer(pixels, colorfmt='rgba', bufferfmt='ubyte')
+            texture.flip_vertical()  # Flip the texture to fix flipped images
+            self.texture_cache.put((image_path, self.thumbnail_level), texture, size[0] * size[1] * 4)
+        return texture
+
+    def load_subset(self, pack_id):
+        self.load_cards(pack_id)
+
+    def update_completion(self, stats=None):
+        stats = stats or self.stats
+        self.completion_percentage = stats.percentage(self.set_id)
+        text = f"Completion: {self.completion_percentage:.2f}%"
+        for pack_id, pack in self.catalog.packs(self.set_id).items():
+            text += f"  |  {pack['name']}: {stats.percentage(self.set_id, pack_id):.2f}%"
+        self.completion_label.text = text
+
+    def make_recommender(self):
+        # Recommendations need NumPy; without it the app runs without them
+        try:
+            from tracker_core import PackRecommender
+        except ImportError:
+            return None
+        return PackRecommender(self.catalog, self.set_id)
 
-    def update_completion(self, instance=None, value=None):
-        owned_cards = [var.active for var in self.card_vars]
-        if self.card_vars:
-            self.completion_percentage = sum(owned_cards) / len(self.card_vars) * 100
-            self.completion_label.text = f"Completion: {self.completion_percentage:.2f}%"
-        else:
-            self.completion_label.text = "Completion: 0%"
+    def update_recommendation(self, stats=None):
+        if self.recommender is None:
+            return
+        with phase('update_recommendation'):
+            best = self.recommender.best_pack(self.collection.owned)
+        if best is None:
+            self.recommendation_label.text = ""
+            return
+        pack_id, expected = best
+        pack_name = self.catalog.packs(self.set_id)[pack_id]['name']
+        self.recommendation_label.text = f"Best pack to open: {pack_name} ({expected:.2f} new cards expected per pack)"
 
     def save_state(self, instance):
         try:
-            with open('data.txt', 'w') as f:
-                for var in self.card_vars:
-                    f.write(f"{int(var.active)}\n")
-                f.write(f"Completion: {self.completion_percentage:.2f}%\n")
+            # Every toggle is already journaled; saving folds the journal into the snapshot
+            with phase('save_state'):
+                self.collection.compact()
             popup = Popup(title="Success", content=Label(text="State saved successfully."), size_hint=(0.5, 0.5))
             popup.open()
         except Exception as e:
@@ -203,16 +371,24 @@ class PokeSetTrackerApp(App):
 
     def load_state(self, instance):
         try:
-            with open('data.txt', 'r') as f:
-                lines = f.readlines()
-                for i, var in enumerate(self.card_vars):
-                    var.active = bool(int(lines[i].strip()))
-                self.update_completion()
+            with phase('load_state'):
+                self.collection.load()
+                self.stats.recompute(self.collection.owned)
+                self.search_index.set_owned_cards(self.collection.owned)
+                for card in self.set_cards:
+                    card['owned'] = card['card_id'] in self.collection
+                self.apply_filters()
             popup = Popup(title="Success", content=Label(text="State loaded successfully."), size_hint=(0.5, 0.5))
             popup.open()
         except Exception as e:
             popup = Popup(title="Error", content=Label(text=f"Error loading state: {e}"), size_hint=(0.5, 0.5))
             popup.open()
 
+    def on_stop(self):
+        self.card_loader.shutdown()
+        self.collection.close()
+        for line in summary():
+            log(line)
+
 if __name__ == '__main__':
     PokeSetTrackerApp().run()
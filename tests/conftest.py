@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+import pytest
+
+# Run from anywhere without installing the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_set(tmp_path):
+    # Writes a card_sets.json with one set 'test' and an empty image per filename;
+    # the catalog only looks at filenames. Returns the path of card_sets.json.
+    def make(filenames, packs=None, rarities=None, pull_rates=None, **set_options):
+        cards_dir = tmp_path / 'cards'
+        cards_dir.mkdir(exist_ok=True)
+        for filename in filenames:
+            (cards_dir / filename).touch()
+        set_info = dict({'name': 'Test', 'directory': 'cards'}, **set_options)
+        if packs is not None:
+            set_info['packs'] = {
+                pack_id: {'name': pack_id.capitalize(), 'button': 'assets/button1.png', 'cards': numbers}
+                for pack_id, numbers in packs.items()
+            }
+        if rarities is not None:
+            set_info['rarities'] = rarities
+        if pull_rates is not None:
+            set_info['pull_rates'] = pull_rates
+        sets_path = tmp_path / 'card_sets.json'
+        sets_path.write_text(json.dumps({'test': set_info}), encoding='utf-8')
+        return str(sets_path)
+
+    return make
+
+
+def bump_mtime(path):
+    # Directory mtimes can be too coarse to notice two quick changes; force a new one
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
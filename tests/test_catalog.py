@@ -0,0 +1,85 @@
+import os
+from tracker_core import CardCatalog, parse_card_filename
+from conftest import bump_mtime
+
+
+def test_parse_card_filename():
+    assert parse_card_filename('4-charizard-ex-301x420.png') == (4, 'Charizard-ex')
+    assert parse_card_filename('12-mr-mime.png') == (12, 'Mr-mime')
+    assert parse_card_filename('promo-301x420.png') == (None, 'Promo')
+
+
+def test_cards_are_sorted_with_packs_and_rarities(make_set):
+    sets_path = make_set(
+        ['10-c.png', '2-b.png', '1-a.png', 'promo.png', 'notes.txt'],
+        packs={'red': [1, 2], 'blue': [2]},
+        rarities={'common': [[1, 2]], 'rare': [[10, 10]]},
+    )
+    catalog = CardCatalog(sets_path)
+    assert [card.card_id for card in catalog.cards_in('test')] == ['test-1', 'test-2', 'test-10', 'test-promo']
+    assert [card.card_id for card in catalog.cards_in('test', 'red')] == ['test-1', 'test-2']
+    assert [card.card_id for card in catalog.cards_in('test', 'blue')] == ['test-2']
+    assert catalog.by_id['test-2'].packs == ('red', 'blue')
+    assert catalog.by_id['test-10'].rarity == 'rare'
+    assert catalog.by_id['test-promo'].rarity is None
+
+
+def test_refresh_rescans_only_changed_directories(make_set, tmp_path):
+    sets_path = make_set(['1-a.png', '2-b.png'])
+    catalog = CardCatalog(sets_path)
+    assert not catalog.refresh()
+
+    (tmp_path / 'cards' / '3-c.png').touch()
+    (tmp_path / 'cards' / '1-a.png').unlink()
+    bump_mtime(tmp_path / 'cards')
+    assert catalog.refresh()
+    assert [card.card_id for card in catalog.cards_in('test')] == ['test-2', 'test-3']
+    assert not catalog.refresh()
+
+    # A new catalog starts from the persisted index
+    assert os.path.exists(catalog.index_path)
+    assert not CardCatalog(sets_path).refresh()
+
+
+def test_missing_directory(make_set, tmp_path):
+    sets_path = make_set(['1-a.png'])
+    (tmp_path / 'cards' / '1-a.png').unlink()
+    (tmp_path / 'cards').rmdir()
+    catalog = CardCatalog(sets_path)
+    assert catalog.cards_in('test') == []
+    assert catalog.missing_directories == [str(tmp_path / 'cards')]
+
+
+def test_shared_numbers_get_name_suffixes(make_set):
+    catalog = CardCatalog(make_set(['237-eevee.png', '237-slowpoke.png', '1-a.png'], shared_numbers=[237]))
+    assert set(catalog.by_id) == {'test-1', 'test-237-eevee', 'test-237-slowpoke'}
+
+
+def test_undeclared_shared_number_is_reported(make_set, capsys):
+    catalog = CardCatalog(make_set(['237-eevee.png', '237-slowpoke.png']))
+    assert set(catalog.by_id) == {'test-237-eevee', 'test-237-slowpoke'}
+    assert "add it to 'shared_numbers'" in capsys.readouterr().out
+
+
+def test_card_ids_only_depend_on_filenames(make_set, tmp_path):
+    sets_path = make_set(['237-eevee.png', '1-a.png'], shared_numbers=[237])
+    catalog = CardCatalog(sets_path)
+    assert set(catalog.by_id) == {'test-1', 'test-237-eevee'}
+
+    (tmp_path / 'cards' / '237-slowpoke.png').touch()
+    bump_mtime(tmp_path / 'cards')
+    catalog.refresh()
+    assert set(catalog.by_id) == {'test-1', 'test-237-eevee', 'test-237-slowpoke'}
+
+    # Neither removing a file nor losing the index renames the others
+    (tmp_path / 'cards' / '237-eevee.png').unlink()
+    os.remove(catalog.index_path)
+    assert set(CardCatalog(sets_path).by_id) == {'test-1', 'test-237-slowpoke'}
+
+
+def test_corrupt_index_is_rebuilt(make_set):
+    sets_path = make_set(['1-a.png'])
+    catalog = CardCatalog(sets_path)
+    with open(catalog.index_path, 'w') as f:
+        f.write('{"version": ')
+    assert set(CardCatalog(sets_path).by_id) == {'test-1'}
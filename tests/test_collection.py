@@ -0,0 +1,107 @@
+import json
+import os
+import pytest
+from tracker_core import CollectionStore
+from tracker_core.collection import decode_owned, encode_owned, move_aside
+
+
+def test_encode_decode_round_trip():
+    owned = {'apex-1', 'apex-4', 'apex-286', 'apex-237-eevee', 'other-0', 'other-badge'}
+    encoded = encode_owned(owned)
+    assert encoded['apex']['extra'] == ['apex-237-eevee']
+    assert decode_owned(json.loads(json.dumps(encoded))) == owned
+
+
+def test_empty_round_trip():
+    assert encode_owned(set()) == {}
+    assert decode_owned({}) == set()
+
+
+def test_journal_is_replayed(tmp_path):
+    path = str(tmp_path / 'collection.json')
+    store = CollectionStore(path)
+    assert store.set_owned('apex-1', True)
+    assert not store.set_owned('apex-1', True)
+    store.set_owned('apex-2', True)
+    store.set_owned('apex-1', False)
+    assert store.set_owned_many(['apex-2', 'apex-3', 'apex-4'], True) == ['apex-3', 'apex-4']
+    store.close()
+
+    assert CollectionStore(path).owned == {'apex-2', 'apex-3', 'apex-4'}
+
+
+def test_torn_journal_line_is_truncated(tmp_path):
+    path = str(tmp_path / 'collection.json')
+    journal = tmp_path / 'collection.journal'
+    journal.write_bytes(b'+apex-1\n+apex-2\n+apex-')
+
+    store = CollectionStore(path)
+    assert store.owned == {'apex-1', 'apex-2'}
+    assert journal.read_bytes() == b'+apex-1\n+apex-2\n'
+
+    # Later appends start on a clean line
+    store.set_owned('apex-3', True)
+    store.close()
+    assert CollectionStore(path).owned == {'apex-1', 'apex-2', 'apex-3'}
+
+
+def test_read_only_leaves_torn_journal(tmp_path):
+    journal = tmp_path / 'collection.journal'
+    journal.write_bytes(b'+apex-1\n+apex-')
+
+    store = CollectionStore(str(tmp_path / 'collection.json'), read_only=True)
+    assert store.owned == {'apex-1'}
+    assert journal.read_bytes() == b'+apex-1\n+apex-'
+    with pytest.raises(ValueError):
+        store.set_owned('apex-2', True)
+
+
+def test_compact_then_reload(tmp_path):
+    path = str(tmp_path / 'collection.json')
+    store = CollectionStore(path)
+    store.replace({'apex-1', 'apex-5', 'apex-237-eevee'})
+    store.compact()
+    assert (tmp_path / 'collection.journal').read_text() == ''
+
+    store.set_owned('apex-5', False)
+    store.close()
+    assert CollectionStore(path).owned == {'apex-1', 'apex-237-eevee'}
+
+
+def test_compacts_automatically(tmp_path):
+    path = str(tmp_path / 'collection.json')
+    store = CollectionStore(path, compact_every=3)
+    for number in range(3):
+        store.set_owned(f"apex-{number}", True)
+    assert (tmp_path / 'collection.journal').read_text() == ''
+    store.close()
+    assert CollectionStore(path).owned == {'apex-0', 'apex-1', 'apex-2'}
+
+
+def test_unsupported_version(tmp_path):
+    path = tmp_path / 'collection.json'
+    path.write_text(json.dumps({'version': 99, 'sets': {}}))
+    with pytest.raises(ValueError):
+        CollectionStore(str(path))
+
+
+def test_import_legacy(tmp_path):
+    legacy = tmp_path / 'data.txt'
+    legacy.write_text('1\n0\n1\n')
+    store = CollectionStore(str(tmp_path / 'collection.json'))
+    store.import_legacy(str(legacy), ['apex-1', 'apex-2', 'apex-3', 'apex-4'])
+    assert store.owned == {'apex-1', 'apex-3'}
+
+
+def test_move_aside_unreadable_collection(tmp_path):
+    path = tmp_path / 'collection.json'
+    path.write_text('{"version": 1, "se')
+    (tmp_path / 'collection.journal').write_text('+apex-1\n')
+    with pytest.raises(ValueError):
+        CollectionStore(str(path))
+
+    moved = move_aside(str(path))
+    assert [os.path.basename(p).split('.bad-')[0] for p in moved] == ['collection.json', 'collection.journal']
+    assert open(moved[0]).read() == '{"version": 1, "se'
+    store = CollectionStore(str(path))
+    assert not store.exists() and store.owned == set()
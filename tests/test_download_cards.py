@@ -0,0 +1,282 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+pytest.importorskip('requests')
+Image = pytest.importorskip('PIL.Image')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utilities'))
+import download_cards  # noqa: E402
+
+
+class CardHandler(BaseHTTPRequestHandler):
+    # Serves `files` with ETags, conditional GETs and byte ranges, and records every request.
+    # Paths in `truncate` have their next body cut off halfway, like a dropped connection;
+    # `ignore_range_start` makes ranged responses start at byte 0 whatever was asked for.
+    files = {}
+    seen = []
+    truncate = set()
+    ignore_range_start = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body):
+        self.seen.append((self.command, self.path, dict(self.headers)))
+        data = self.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        start = 0
+        requested = self.headers.get('Range')
+        if requested and self.headers.get('If-Range', etag) == etag:
+            start = 0 if self.ignore_range_start else int(requested.split('=')[1].split('-')[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(data)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        if not send_body:
+            return
+        if self.path in self.truncate:
+            self.truncate.discard(self.path)
+            self.wfile.write(data[start:len(data) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data[start:])
+
+
+def image_bytes(color, image_format):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (60, 84), color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def noise_bytes(image_format):
+    # Larger than a download chunk, so an interrupted transfer leaves part of it behind
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (300, 300), os.urandom(300 * 300 * 3)).save(buffer, image_format, lossless=True)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server():
+    handler = type('Handler', (CardHandler,), {
+        'files': {
+            '/cards/1-bulbasaur.webp': image_bytes((0, 200, 0, 255), 'WEBP'),
+            '/cards/2-ivysaur.webp': image_bytes((0, 150, 0, 255), 'WEBP'),
+            '/cards/3-venusaur.png': image_bytes((0, 100, 0, 255), 'PNG'),
+        },
+        'seen': [],
+        'truncate': set(),
+    })
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield handler, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def image_urls(server, tmp_path):
+    # A HAR with the card images, a duplicate, a page that isn't an image and a missing image
+    _, base_url = server
+    paths = ['/cards/1-bulbasaur.webp', '/cards/2-ivysaur.webp', '/index.html', '/cards/1-bulbasaur.webp',
+             '/cards/3-venusaur.png', '/cards/4-missing.webp']
+    har = {'log': {'entries': [{'request': {'url': base_url + path}} for path in paths]}}
+    har_file = tmp_path / 'cards.har'
+    har_file.write_text(json.dumps(har), encoding='utf-8')
+    return download_cards.read_image_urls(str(har_file))
+
+
+def download(image_urls, folder, max_size=None):
+    return download_cards.download_images(image_urls, str(folder), workers=2, convert_workers=1, max_size=max_size)
+
+
+def test_read_image_urls(server, image_urls):
+    _, base_url = server
+    assert image_urls == [base_url + path for path in
+                          ['/cards/1-bulbasaur.webp', '/cards/2-ivysaur.webp', '/cards/3-venusaur.png',
+                           '/cards/4-missing.webp']]
+
+
+def test_download_then_skip_unchanged(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+
+    summary = download(image_urls, folder)
+    assert (summary['downloaded'], summary['skipped'], summary['failed'], summary['converted']) == (3, 0, 1, 2)
+    for path, data in handler.files.items():
+        assert (folder / os.path.basename(path)).read_bytes() == data
+    with Image.open(folder / '1-bulbasaur.png') as img:
+        assert img.size == (60, 84)
+    assert not any(name.endswith('.part') for name in os.listdir(folder))
+
+    # The manifest's ETags turn a rerun into 304s and nothing is reconverted
+    handler.seen.clear()
+    summary = download(image_urls, folder)
+    assert (summary['downloaded'], summary['skipped'], summary['failed'], summary['converted']) == (0, 3, 1, 0)
+    assert summary['bytes'] == 0
+    assert all('If-None-Match' in headers for method, path, headers in handler.seen if path in handler.files)
+
+
+def test_skip_by_size_without_manifest(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+    download(image_urls, folder)
+    os.remove(folder / download_cards.MANIFEST_NAME)
+
+    handler.seen.clear()
+    summary = download(image_urls, folder)
+    assert (summary['downloaded'], summary['skipped']) == (0, 3)
+    assert {method for method, path, _ in handler.seen if path in handler.files} == {'HEAD'}
+
+
+def requests_for(handler, path):
+    return [headers for method, request_path, headers in handler.seen if request_path == path and method == 'GET']
+
+
+def test_resume_after_interruption(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+    path = '/cards/2-ivysaur.webp'
+    data = handler.files[path] = noise_bytes('WEBP')
+
+    # The connection drops halfway through; the .part and its ETag are kept
+    handler.truncate.add(path)
+    summary = download(image_urls, folder)
+    assert summary['failed'] == 2
+    part = (folder / '2-ivysaur.webp.part').read_bytes()
+    assert 0 < len(part) < len(data) and data.startswith(part)
+    manifest = download_cards.load_manifest(str(folder))
+    assert manifest[image_urls[1]]['part_etag']
+
+    handler.seen.clear()
+    summary = download(image_urls, folder)
+    assert (summary['downloaded'], summary['bytes']) == (1, len(data) - len(part))
+    assert (folder / '2-ivysaur.webp').read_bytes() == data
+    headers = requests_for(handler, path)[0]
+    assert headers['Range'] == f"bytes={len(part)}-"
+    assert headers['If-Range'] == manifest[image_urls[1]]['part_etag']
+    assert 'part_etag' not in download_cards.load_manifest(str(folder))[image_urls[1]]
+
+
+def test_resume_part_without_manifest_entry(server, image_urls, tmp_path):
+    # Killed before the manifest was written: only the .part is left
+    handler, _ = server
+    folder = tmp_path / 'out'
+    folder.mkdir()
+    data = handler.files['/cards/2-ivysaur.webp']
+    (folder / '2-ivysaur.webp.part').write_bytes(data[:len(data) // 2])
+
+    summary = download(image_urls, folder)
+    assert (folder / '2-ivysaur.webp').read_bytes() == data
+    assert summary['bytes'] == sum(len(body) for body in handler.files.values()) - len(data) // 2
+    assert requests_for(handler, '/cards/2-ivysaur.webp')[0]['Range'] == f"bytes={len(data) // 2}-"
+
+
+def test_complete_part_is_kept(server, image_urls, tmp_path):
+    # The whole body arrived but the rename never happened: the server answers 416
+    handler, _ = server
+    folder = tmp_path / 'out'
+    folder.mkdir()
+    data = handler.files['/cards/2-ivysaur.webp']
+    (folder / '2-ivysaur.webp.part').write_bytes(data)
+
+    summary = download(image_urls, folder)
+    assert summary['failed'] == 1  # Only the missing image
+    assert (folder / '2-ivysaur.webp').read_bytes() == data
+    assert not (folder / '2-ivysaur.webp.part').exists()
+
+
+def test_oversized_part_restarts(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+    folder.mkdir()
+    data = handler.files['/cards/2-ivysaur.webp']
+    (folder / '2-ivysaur.webp.part').write_bytes(data + b'stale')
+
+    download(image_urls, folder)
+    assert (folder / '2-ivysaur.webp').read_bytes() == data
+
+
+def test_wrong_range_start_restarts(server, image_urls, tmp_path):
+    handler, _ = server
+    handler.ignore_range_start = True
+    folder = tmp_path / 'out'
+    folder.mkdir()
+    data = handler.files['/cards/2-ivysaur.webp']
+    (folder / '2-ivysaur.webp.part').write_bytes(data[:len(data) // 2])
+
+    download(image_urls, folder)
+    assert (folder / '2-ivysaur.webp').read_bytes() == data
+
+
+def test_changed_file_is_not_appended_to_part(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+    path = '/cards/2-ivysaur.webp'
+    handler.files[path] = noise_bytes('WEBP')
+    handler.truncate.add(path)
+    download(image_urls, folder)
+    assert (folder / '2-ivysaur.webp.part').exists()
+
+    # The image changes on the server before the resume: If-Range no longer matches
+    handler.files[path] = image_bytes((200, 0, 0, 255), 'WEBP')
+    download(image_urls, folder)
+    assert (folder / '2-ivysaur.webp').read_bytes() == handler.files[path]
+
+
+def test_write_error_fails_one_image(server, image_urls, tmp_path):
+    handler, _ = server
+    folder = tmp_path / 'out'
+    folder.mkdir()
+    # A directory where the image should go makes moving the finished .part raise an OSError
+    (folder / '2-ivysaur.webp').mkdir()
+
+    summary = download(image_urls, folder)
+    assert (summary['downloaded'], summary['failed']) == (2, 2)
+    # Only the finished images are recorded as complete; the other keeps its .part's ETag
+    manifest = download_cards.load_manifest(str(folder))
+    assert {img_url for img_url, entry in manifest.items() if 'etag' in entry} == {image_urls[0], image_urls[2]}
+    assert manifest[image_urls[1]]['part_etag']
+
+
+def test_changed_max_size_reconverts(server, image_urls, tmp_path):
+    folder = tmp_path / 'out'
+    download(image_urls, folder)
+
+    summary = download(image_urls, folder, max_size=(30, 42))
+    assert summary['converted'] == 2
+    with Image.open(folder / '1-bulbasaur.png') as img:
+        assert img.size == (30, 42)
+
+    assert download(image_urls, folder, max_size=(30, 42))['converted'] == 0
+    assert download(image_urls, folder)['converted'] == 2
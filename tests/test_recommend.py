@@ -0,0 +1,88 @@
+import random
+import pytest
+from tracker_core import CardCatalog
+
+np = pytest.importorskip('numpy')
+from tracker_core import PackRecommender  # noqa: E402
+
+PULL_RATES = [{'common': 1.0}, {'common': 0.5, 'rare': 0.5}]
+
+
+@pytest.fixture
+def catalog(make_set):
+    # Cards 3 and 4 are in no pack, so both packs can pull them
+    return CardCatalog(make_set(
+        [f"{number}-card{number}.png" for number in range(1, 7)],
+        packs={'red': [1, 5], 'blue': [2, 6]},
+        rarities={'common': [[1, 4]], 'rare': [[5, 6]]},
+        pull_rates=PULL_RATES,
+    ))
+
+
+def open_pack(rng, pool):
+    # One pack drawn the way the recommender models it: each slot picks a rarity,
+    # then a card uniformly among the pool's cards of that rarity
+    cards = []
+    for slot in PULL_RATES:
+        rarities = [rarity for rarity in slot if pool.get(rarity)]
+        rarity = rng.choices(rarities, weights=[slot[rarity] for rarity in rarities])[0]
+        cards.append(rng.choice(pool[rarity]))
+    return cards
+
+
+def test_expected_new_cards_matches_brute_force(catalog):
+    owned = {'test-3', 'test-5'}
+    expected = PackRecommender(catalog, 'test').expected_new_cards(owned)
+
+    rng = random.Random(0)
+    pools = {
+        'red': {'common': ['test-1', 'test-3', 'test-4'], 'rare': ['test-5']},
+        'blue': {'common': ['test-2', 'test-3', 'test-4'], 'rare': ['test-6']},
+    }
+    trials = 20000
+    for pack_id, pool in pools.items():
+        new = sum(len(set(open_pack(rng, pool)) - owned) for _ in range(trials)) / trials
+        assert expected[pack_id] == pytest.approx(new, abs=0.03)
+    assert expected['blue'] > expected['red']
+
+
+def test_best_pack(catalog):
+    recommender = PackRecommender(catalog, 'test')
+    assert recommender.best_pack({'test-3', 'test-5'})[0] == 'blue'
+    all_cards = {card.card_id for card in catalog.cards}
+    assert recommender.expected_new_cards(all_cards) == {'red': 0.0, 'blue': 0.0}
+
+
+def test_simulation_matches_coupon_collector(make_set):
+    # One pack, one slot, four equally likely cards: E[packs] = 4 * (1 + 1/2 + 1/3 + 1/4)
+    catalog = CardCatalog(make_set(
+        [f"{number}-card{number}.png" for number in range(1, 5)],
+        packs={'only': [1, 2, 3, 4]},
+        rarities={'common': [[1, 4]]},
+        pull_rates=[{'common': 1.0}],
+    ))
+    result = PackRecommender(catalog, 'test').simulate_packs_to_completion(set(), trials=20000, seed=3)
+    assert result['only'].trials == 20000
+    assert result['only'].mean == pytest.approx(25 / 3, abs=0.15)
+
+
+def test_simulation_is_deterministic_across_workers(catalog):
+    recommender = PackRecommender(catalog, 'test')
+    single = recommender.simulate_packs_to_completion({'test-3'}, trials=500, seed=7, workers=1, batch_size=100)
+    pooled = recommender.simulate_packs_to_completion({'test-3'}, trials=500, seed=7, workers=2, batch_size=100)
+    assert single == pooled
+    assert single['red'].trials == 500
+
+
+@pytest.mark.parametrize('rarities, pull_rates', [
+    (None, None),
+    ({'common': [[1, 2]]}, None),
+    (None, [{'common': 1.0}]),
+])
+def test_set_without_pull_rates(make_set, rarities, pull_rates):
+    catalog = CardCatalog(make_set(['1-a.png', '2-b.png'], packs={'only': [1, 2]},
+                                   rarities=rarities, pull_rates=pull_rates))
+    recommender = PackRecommender(catalog, 'test')
+    assert recommender.expected_new_cards(set()) == {'only': 0.0}
+    assert recommender.best_pack(set()) is None
+    assert recommender.simulate_packs_to_completion(set(), trials=10, seed=0) == {}
@@ -0,0 +1,101 @@
+import pytest
+from tracker_core import CardCatalog
+from tracker_core.search import SearchIndex, bits_to_positions, parse_search, positions_to_bits
+
+
+@pytest.fixture
+def index(make_set):
+    catalog = CardCatalog(make_set(
+        ['1-bulbasaur.png', '2-ivysaur.png', '3-venusaur-ex.png', '4-charmander.png',
+         '5-charizard-ex.png', '6-mr-mime.png', 'promo-pikachu.png'],
+        packs={'red': [4, 5], 'green': [1, 2, 3]},
+        rarities={'common': [[1, 2], [4, 4], [6, 6]], 'rare': [[3, 3], [5, 5]]},
+    ))
+    cards = catalog.cards_in('test')
+    return cards, SearchIndex(cards, {'test-2', 'test-5'})
+
+
+def names(index, text='', **filters):
+    # Names of the cards found for search box text plus any other filters
+    cards, search_index = index
+    terms, ranges = parse_search(text)
+    return [cards[i].name for i in search_index.query(terms, ranges, **filters)]
+
+
+def test_parse_search():
+    assert parse_search('') == ([], [])
+    assert parse_search('char* ex #1-20 #50 7') == ([('char', True), ('ex', False)], [(1, 20), (50, 50), (7, 7)])
+    assert parse_search('#20-1 * mr-mime**') == ([('mr-mime', True)], [(1, 20)])
+
+
+def test_bits_round_trip():
+    assert bits_to_positions(positions_to_bits([0, 9, 3, 64])) == [0, 3, 9, 64]
+    assert positions_to_bits([]) == 0
+    assert bits_to_positions(0) == []
+
+
+def test_no_filters_keeps_catalog_order(index):
+    assert names(index) == ['Bulbasaur', 'Ivysaur', 'Venusaur-ex', 'Charmander', 'Charizard-ex', 'Mr-mime',
+                            'Promo-pikachu']
+
+
+def test_substring_and_prefix(index):
+    assert names(index, 'saur') == ['Bulbasaur', 'Ivysaur', 'Venusaur-ex']
+    assert names(index, 'CHAR') == ['Charmander', 'Charizard-ex']
+    assert names(index, 'ex') == ['Venusaur-ex', 'Charizard-ex']
+    # A prefix matches the start of the name or of any word in it
+    assert names(index, 'ex*') == ['Venusaur-ex', 'Charizard-ex']
+    assert names(index, 'saur*') == []
+    assert names(index, 'mi*') == ['Mr-mime']
+
+
+def test_every_word_must_match(index):
+    assert names(index, 'char* ex') == ['Charizard-ex']
+    assert names(index, 'ex char*') == ['Charizard-ex']
+    assert names(index, 'saur ex*') == ['Venusaur-ex']
+    assert names(index, 'saur pika') == []
+
+
+def test_number_range(index):
+    assert names(index, '#2-4') == ['Ivysaur', 'Venusaur-ex', 'Charmander']
+    assert names(index, '#9-20') == []
+    cards, search_index = index
+    assert [cards[i].name for i in search_index.query(ranges=[(6, None)])] == ['Mr-mime', 'Promo-pikachu']
+
+
+def test_number_ranges_add_up(index):
+    assert names(index, '#1 #5') == ['Bulbasaur', 'Charizard-ex']
+    assert names(index, '#1-2 #4-9') == ['Bulbasaur', 'Ivysaur', 'Charmander', 'Charizard-ex', 'Mr-mime']
+    assert names(index, 'saur #2 #3') == ['Ivysaur', 'Venusaur-ex']
+
+
+def test_attribute_filters(index):
+    assert names(index, pack_id='red') == ['Charmander', 'Charizard-ex']
+    assert names(index, rarity='rare') == ['Venusaur-ex', 'Charizard-ex']
+    assert names(index, owned=True) == ['Ivysaur', 'Charizard-ex']
+    assert names(index, owned=False, pack_id='green') == ['Bulbasaur', 'Venusaur-ex']
+    assert names(index, pack_id='missing') == []
+    assert names(index, 'char', rarity='rare', owned=True) == ['Charizard-ex']
+
+
+def test_owned_updates(index):
+    cards, search_index = index
+    search_index.set_owned('test-1', True)
+    search_index.set_owned('test-2', False)
+    search_index.set_owned('unknown', True)
+    assert names(index, owned=True) == ['Bulbasaur', 'Charizard-ex']
+
+    search_index.set_owned_cards({'test-6'})
+    assert names(index, owned=True) == ['Mr-mime']
+
+
+def test_names_match_with_spaces_or_hyphens(index):
+    # Names are shown hyphenated as in the filenames, but typed with spaces
+    assert names(index, 'charizard ex') == ['Charizard-ex']
+    assert names(index, 'Charizard-EX') == ['Charizard-ex']
+    assert names(index, 'mr  mime') == ['Mr-mime']
+    assert names(index, 'mr mi*') == ['Mr-mime']
+    assert names(index, 'r-m') == ['Mr-mime']
+    assert names(index, ' - ') == names(index)
+    cards, search_index = index
+    assert [cards[i].name for i in search_index.query([('charizard ex', False)])] == ['Charizard-ex']
@@ -0,0 +1,49 @@
+from tracker_core import CardCatalog, CompletionStats
+
+
+def make_stats(make_set, owned=()):
+    catalog = CardCatalog(make_set(['1-a.png', '2-b.png', '3-c.png', '4-d.png'], packs={'red': [1, 2], 'blue': [2, 3]}))
+    return catalog, CompletionStats(catalog, owned)
+
+
+def test_counters(make_set):
+    _, stats = make_stats(make_set, {'test-2', 'test-4', 'unknown-1'})
+    assert stats.completion() == {
+        ('test', None): (2, 4),
+        ('test', 'red'): (1, 2),
+        ('test', 'blue'): (1, 2),
+    }
+    assert stats.percentage('test') == 50.0
+    assert stats.percentage('test', 'missing') == 0.0
+
+
+def test_update_matches_recompute(make_set):
+    catalog, stats = make_stats(make_set)
+    owned = set()
+    for card_id in ['test-1', 'test-2', 'test-3']:
+        owned.add(card_id)
+        stats.update(card_id, True)
+    owned.discard('test-2')
+    stats.update('test-2', False)
+
+    incremental = stats.completion()
+    assert incremental == CompletionStats(catalog, owned).completion()
+    assert incremental[('test', 'red')] == (1, 2)
+
+
+def test_suspended_notifies_once(make_set):
+    _, stats = make_stats(make_set)
+    calls = []
+    stats.listeners.append(lambda s: calls.append(s.completion()[('test', None)]))
+
+    with stats.suspended():
+        with stats.suspended():
+            stats.update('test-1', True)
+        stats.update('test-2', True)
+        assert calls == []
+    assert calls == [(2, 4)]
+
+    # Nothing changed, nothing to report
+    with stats.suspended():
+        pass
+    assert calls == [(2, 4)]
@@ -0,0 +1,113 @@
+import os
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+from thumbnail_cache import HEADER, THUMBNAIL_LEVELS, TextureLRU, ThumbnailCache  # noqa: E402
+
+
+def save_image(path, mode='RGB', size=(30, 42), color=(255, 0, 0)):
+    img = Image.new('RGB', size, color)
+    if mode == 'P':
+        img = img.convert('P')
+    img.save(path)
+    return str(path)
+
+
+def entry_size(size):
+    return HEADER.size + size[0] * size[1] * 4
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'P'])
+def test_source_is_converted_to_rgba(tmp_path, mode):
+    # A web-safe color survives the palette conversion unchanged
+    image_path = save_image(tmp_path / 'card.png', mode, color=(0, 51, 102))
+    size, pixels = ThumbnailCache(str(tmp_path / 'cache')).read(image_path)
+    assert size == (30, 42)
+    assert len(pixels) == 30 * 42 * 4
+    assert pixels[:4] == bytes((0, 51, 102, 255))
+
+
+def test_levels_shrink_large_sources(tmp_path):
+    image_path = save_image(tmp_path / 'card.png', size=(602, 840))
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    assert cache.read(image_path, 'large')[0] == THUMBNAIL_LEVELS['large']
+    # Aspect ratio is kept, so a level is an upper bound
+    width, height = cache.read(image_path, 'small')[0]
+    assert height == THUMBNAIL_LEVELS['small'][1] and width <= THUMBNAIL_LEVELS['small'][0]
+
+
+def test_open_maps_the_cached_pixels(tmp_path):
+    image_path = save_image(tmp_path / 'card.png')
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    expected = cache.read(image_path)
+    with cache.open(image_path) as (size, pixels):
+        assert (size, bytes(pixels)) == expected
+
+
+def test_changed_source_is_rebuilt(tmp_path):
+    image_path = save_image(tmp_path / 'card.png', color=(255, 0, 0))
+    cache = ThumbnailCache(str(tmp_path / 'cache'))
+    old_path = cache.cache_path(image_path, 'large')
+    assert cache.read(image_path)[1][:4] == bytes((255, 0, 0, 255))
+
+    save_image(image_path, color=(0, 0, 255))
+    stat = os.stat(image_path)
+    os.utime(image_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.cache_path(image_path, 'large') != old_path
+    assert cache.read(image_path)[1][:4] == bytes((0, 0, 255, 255))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = [save_image(tmp_path / f"card{i}.png", color=(i, 0, 0)) for i in range(4)]
+    one = entry_size((30, 42))
+    cache = ThumbnailCache(str(tmp_path / 'cache'), max_bytes=int(3.5 * one))
+    for i, image_path in enumerate(paths[:3]):
+        cache.read(image_path)
+        # Spread the recency stamps so the order doesn't depend on timer resolution
+        os.utime(cache.cache_path(image_path, 'large'), (1000 + i, 1000 + i))
+
+    # Reading card0 again makes card1 the oldest
+    cache.read(paths[0])
+    cache.read(paths[3])
+    cached = {image_path for image_path in paths if os.path.exists(cache.cache_path(image_path, 'large'))}
+    assert cached == {paths[0], paths[2], paths[3]}
+    assert cache.total_bytes == 3 * one <= cache.max_bytes
+
+
+def test_entry_larger_than_budget_is_kept(tmp_path):
+    image_path = save_image(tmp_path / 'card.png')
+    cache = ThumbnailCache(str(tmp_path / 'cache'), max_bytes=1000)
+    size, pixels = cache.read(image_path)
+    assert len(pixels) == 30 * 42 * 4
+    assert cache.read(image_path) == (size, pixels)
+
+
+def test_total_bytes_survives_reopen(tmp_path):
+    image_path = save_image(tmp_path / 'card.png')
+    ThumbnailCache(str(tmp_path / 'cache')).read(image_path)
+    assert ThumbnailCache(str(tmp_path / 'cache')).total_bytes == entry_size((30, 42))
+
+
+def test_texture_lru_accounting():
+    lru = TextureLRU(max_bytes=100)
+    lru.put('a', 'texture-a', 40)
+    lru.put('b', 'texture-b', 40)
+    assert (len(lru), lru.total_bytes) == (2, 80)
+
+    # Replacing a key counts its new size only once
+    lru.put('a', 'texture-a2', 30)
+    assert (len(lru), lru.total_bytes) == (2, 70)
+
+    # 'b' is now the least recently used, so it goes first
+    assert lru.get('a') == 'texture-a2'
+    lru.put('c', 'texture-c', 50)
+    assert lru.get('b') is None
+    assert (len(lru), lru.total_bytes) == (2, 80)
+
+    # A single item over the budget is still kept
+    lru.put('huge', 'texture-huge', 500)
+    assert (len(lru), lru.total_bytes) == (1, 500)
+    assert lru.get('huge') == 'texture-huge'
+
+    lru.clear()
+    assert (len(lru), lru.total_bytes) == (0, 0)
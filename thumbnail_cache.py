@@ -0,0 +1,149 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from PIL import Image as PILImage
+
+# Thumbnail size levels as (width, height); 'large' matches the source card size
+THUMBNAIL_LEVELS = {
+    'small': (151, 210),
+    'medium': (226, 315),
+    'large': (301, 420),
+}
+
+# Every cached file starts with the pixel size, followed by raw RGBA rows
+HEADER = struct.Struct('<II')
+
+
+class ThumbnailCache:
+    # On-disk cache of downscaled RGBA pixels, one memory-mappable file per
+    # (image path, mtime, size, level). Least recently used files are evicted
+    # once the directory grows past max_bytes. One instance can be shared by
+    # several threads.
+    def __init__(self, cache_dir='.thumbnail_cache', max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def cache_path(self, image_path, level):
+        stat = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{stat.st_mtime_ns}|{stat.st_size}|{level}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.rgba")
+
+    @contextmanager
+    def open(self, image_path, level='large'):
+        # Yields ((width, height), pixels) where pixels is a buffer over the mapped file
+        path = self.cache_path(image_path, level)
+        try:
+            os.utime(path)  # Bump recency for LRU eviction
+        except FileNotFoundError:
+            self._build(image_path, level, path)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            # Evicted by another thread or process in the meantime
+            self._build(image_path, level, path)
+            f = open(path, 'rb')
+
+        # ACCESS_COPY gives a writable private mapping without copying the file
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as mm:
+            width, height = HEADER.unpack_from(mm, 0)
+            buffer = memoryview(mm)
+            pixels = buffer[HEADER.size:]
+            try:
+                yield (width, height), pixels
+            finally:
+                pixels.release()
+                buffer.release()
+
+    def read(self, image_path, level='large'):
+        # Same as open(), but returns a copy of the pixels that outlives the mapping
+        with self.open(image_path, level) as (size, pixels):
+            return size, bytes(pixels)
+
+    def _build(self, image_path, level, path):
+        with PILImage.open(image_path) as img:
+            # Source images are not guaranteed to be RGBA (e.g. converted webp or jpg)
+            img = img.convert('RGBA')
+            max_width, max_height = THUMBNAIL_LEVELS[level]
+            if img.width > max_width or img.height > max_height:
+                img.thumbnail((max_width, max_height), PILImage.LANCZOS)
+            data = HEADER.pack(img.width, img.height) + img.tobytes()
+
+        # Write to a temporary file first so a crash never leaves a truncated entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        # Decoding runs unlocked; only the size accounting and eviction are serialized
+        with self._lock:
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                # Never the entry just built, even if it alone is over the budget
+                self.evict(keep=path)
+
+    def _entries(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.rgba'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removed by another process while listing
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def evict(self, target_bytes=None, keep=None):
+        # Drop least recently used files, except `keep`, until the cache fits in target_bytes
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * 0.9)
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            total = sum(size for _, _, size in entries)
+            for path, _, size in entries:
+                if total <= target_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self.total_bytes = total
+
+
+class TextureLRU:
+    # In-process cache of GPU textures so switching views does not re-upload pixels
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, texture, nbytes):
+        if key in self._items:
+            self.total_bytes -= self._items.pop(key)[1]
+        self._items[key] = (texture, nbytes)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, evicted_bytes) = self._items.popitem(last=False)
+            self.total_bytes -= evicted_bytes
+
+    def clear(self):
+        self._items.clear()
+        self.total_bytes = 0
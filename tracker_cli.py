@@ -0,0 +1,207 @@
+import argparse
+import errno
+import json
+import os
+import sys
+from tracker_core import CardCatalog, CollectionStore, CompletionStats, DEFAULT_SETS_PATH
+
+
+def read_collection(path):
+    store = CollectionStore(path, read_only=True)
+    if not store.exists():
+        raise FileNotFoundError(errno.ENOENT, "no collection found", path)
+    return store.owned
+
+
+def describe_error(e, path=None):
+    # 'path: error: message', using the file named by an OSError where there is one
+    path = getattr(e, 'filename', None) or path
+    message = getattr(e, 'strerror', None) or str(e)
+    return f"{path}: error: {message}" if path else f"error: {message}"
+
+
+def format_completion(catalog, stats, set_id):
+    owned, total = stats.completion()[(set_id, None)]
+    lines = [f"{catalog.sets[set_id]['name']}: {owned}/{total} ({stats.percentage(set_id):.2f}%)"]
+    for pack_id, pack in catalog.packs(set_id).items():
+        owned, total = stats.completion()[(set_id, pack_id)]
+        lines.append(f"  {pack['name']}: {owned}/{total} ({stats.percentage(set_id, pack_id):.2f}%)")
+    return lines
+
+
+def command_completion(catalog, args):
+    # One catalog and one set of counters for every file; each file only costs its own read
+    stats = CompletionStats(catalog)
+    status = 0
+    for path in args.collections:
+        try:
+            stats.recompute(read_collection(path))
+        except (OSError, ValueError) as e:
+            print(describe_error(e, path), file=sys.stderr)
+            status = 1
+            continue
+
+        if args.json:
+            completion = {}
+            for (set_id, pack_id), (owned, total) in stats.completion().items():
+                completion.setdefault(set_id, {})[pack_id or 'total'] = {'owned': owned, 'total': total}
+            print(json.dumps({'collection': path, 'completion': completion}))
+        else:
+            print(path)
+            for set_id in catalog.sets:
+                for line in format_completion(catalog, stats, set_id):
+                    print(f"  {line}")
+    return status
+
+
+def command_missing(catalog, args):
+    owned = read_collection(args.collection)
+    set_ids = [args.set] if args.set else list(catalog.sets)
+    for set_id in set_ids:
+        if args.pack and args.pack not in catalog.packs(set_id):
+            continue
+        pack_ids = [args.pack] if args.pack else [None] + list(catalog.packs(set_id))
+        for pack_id in pack_ids:
+            missing = [card for card in catalog.cards_in(set_id, pack_id) if card.card_id not in owned]
+            title = catalog.sets[set_id]['name']
+            if pack_id is not None:
+                title += f" / {catalog.packs(set_id)[pack_id]['name']}"
+            print(f"{title}: {len(missing)} missing")
+            for card in missing:
+                print(f"  {card.number if card.number is not None else '-':>4}  {card.name}  ({card.card_id})")
+    return 0
+
+
+def command_export(catalog, args):
+    owned = sorted(read_collection(args.collection))
+    if args.output.endswith('.json'):
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'owned': owned}, f, indent=1)
+    else:
+        # One card ID per line
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(f"{card_id}\n" for card_id in owned)
+    print(f"Exported {len(owned)} cards to {args.output}")
+    return 0
+
+
+def command_import(catalog, args):
+    store = CollectionStore(args.collection)
+    if args.legacy:
+        # Old data.txt: one '0'/'1' line per card of the full set view
+        set_id = args.set or next(iter(catalog.sets))
+        store.import_legacy(args.source, [card.card_id for card in catalog.cards_in(set_id)])
+    else:
+        if args.source.endswith('.json'):
+            with open(args.source, 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except ValueError:
+                    data = None
+            if not isinstance(data, dict) or not isinstance(data.get('owned'), list):
+                store.close()
+                print(f"{args.source}: error: not an exported collection", file=sys.stderr)
+                return 1
+            owned = set(data['owned'])
+        else:
+            with open(args.source, 'r', encoding='utf-8') as f:
+                owned = {line.strip() for line in f if line.strip()}
+        unknown = owned - catalog.by_id.keys()
+        if unknown:
+            print(f"Warning: {len(unknown)} card IDs are not in the catalog", file=sys.stderr)
+        store.replace(owned if args.replace else store.owned | owned)
+        store.compact()
+    store.close()
+    print(f"{args.collection} now has {len(store)} cards")
+    return 0
+
+
+def command_recommend(catalog, args):
+    try:
+        from tracker_core import PackRecommender  # NumPy is only needed here
+    except ImportError as e:
+        print(f"error: recommendations need NumPy ({e})", file=sys.stderr)
+        return 1
+
+    owned = read_collection(args.collection)
+    set_ids = [args.set] if args.set else list(catalog.sets)
+    for set_id in set_ids:
+        recommender = PackRecommender(catalog, set_id)
+        expected = recommender.expected_new_cards(owned)
+        simulated = {}
+        if args.simulate:
+            simulated = recommender.simulate_packs_to_completion(
+                owned, trials=args.simulate, seed=args.seed, workers=args.workers)
+        print(catalog.sets[set_id]['name'])
+        for pack_id in sorted(expected, key=expected.get, reverse=True):
+            line = f"  {catalog.packs(set_id)[pack_id]['name']}: {expected[pack_id]:.3f} new cards per pack"
+            if pack_id in simulated:
+                result = simulated[pack_id]
+                line += f", {result.mean:.0f} packs to complete (median {result.median:.0f}, p90 {result.p90:.0f})"
+            print(line)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query PokéSet Tracker collections without starting the app.")
+    parser.add_argument('--sets', default=DEFAULT_SETS_PATH, help="card set definitions (card_sets.json)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    completion = commands.add_parser('completion', help="print completion per set and pack")
+    completion.add_argument('collections', nargs='*', default=['collection.json'], help="collection files")
+    completion.add_argument('--json', action='store_true', help="print one JSON object per collection")
+    completion.set_defaults(handler=command_completion)
+
+    missing = commands.add_parser('missing', help="list missing cards per pack")
+    missing.add_argument('collection', nargs='?', default='collection.json')
+    missing.add_argument('--set', help="only this set")
+    missing.add_argument('--pack', help="only this pack")
+    missing.set_defaults(handler=command_missing)
+
+    export = commands.add_parser('export', help="write owned card IDs to a .json or text file")
+    export.add_argument('collection')
+    export.add_argument('-o', '--output', required=True)
+    export.set_defaults(handler=command_export)
+
+    import_ = commands.add_parser('import', help="add owned cards from an exported file")
+    import_.add_argument('source')
+    import_.add_argument('-c', '--collection', default='collection.json')
+    import_.add_argument('--replace', action='store_true', help="drop cards not in the source")
+    import_.add_argument('--legacy', action='store_true', help="source is an old positional data.txt")
+    import_.add_argument('--set', help="set the legacy file belongs to")
+    import_.set_defaults(handler=command_import)
+
+    recommend = commands.add_parser('recommend', help="rank packs by expected new cards")
+    recommend.add_argument('collection', nargs='?', default='collection.json')
+    recommend.add_argument('--set', help="only this set")
+    recommend.add_argument('--simulate', type=int, default=0, metavar='TRIALS', help="also simulate packs to completion")
+    recommend.add_argument('--seed', type=int, default=None)
+    recommend.add_argument('--workers', type=int, default=1, help="processes for the simulation")
+    recommend.set_defaults(handler=command_recommend)
+
+    args = parser.parse_args(argv)
+    try:
+        catalog = CardCatalog(os.path.abspath(args.sets))
+    except (OSError, ValueError) as e:
+        print(describe_error(e, args.sets), file=sys.stderr)
+        return 1
+
+    # --set and --pack can only be checked once the set definitions are loaded
+    set_id = getattr(args, 'set', None)
+    if set_id is not None and set_id not in catalog.sets:
+        parser.error(f"unknown set '{set_id}' (choose from {', '.join(catalog.sets)})")
+    pack_id = getattr(args, 'pack', None)
+    if pack_id is not None:
+        pack_ids = {pack for s in ([set_id] if set_id else catalog.sets) for pack in catalog.packs(s)}
+        if pack_id not in pack_ids:
+            parser.error(f"unknown pack '{pack_id}' (choose from {', '.join(sorted(pack_ids))})")
+
+    try:
+        return args.handler(catalog, args)
+    except (OSError, ValueError) as e:
+        print(describe_error(e), file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# Kivy-free core of PokéSet Tracker: card catalog, collection state, completion
+# stats and pack recommendation. NumPy is only imported when the recommender is used.
+from .catalog import Card, CardCatalog, DEFAULT_SETS_PATH, parse_card_filename
+from .collection import CollectionStore
+from .stats import CompletionStats
+
+
+def __getattr__(name):
+    if name in ('PackRecommender', 'SimulationResult'):
+        from . import recommend
+        return getattr(recommend, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'Card', 'CardCatalog', 'CollectionStore', 'CompletionStats', 'DEFAULT_SETS_PATH',
+    'PackRecommender', 'SimulationResult', 'parse_card_filename',
+]
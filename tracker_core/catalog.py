@@ -0,0 +1,175 @@
+import json
+import os
+import re
+from collections import namedtuple
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+INDEX_VERSION = 3
+
+# Set definitions shipped with the app; directories in it are relative to its folder
+DEFAULT_SETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'card_sets.json')
+
+Card = namedtuple('Card', ['card_id', 'set_id', 'number', 'name', 'image_path', 'packs', 'rarity'])
+
+
+def parse_card_filename(filename):
+    # '4-charizard-ex-301x420.png' -> (4, 'Charizard-ex'); number is None if missing
+    stem = filename.split('.')[0]
+    match = re.match(r"(\d+)-?(.*)", stem)
+    if match:
+        number = int(match.group(1))
+        name = re.sub(r'-\d+x\d+', '', match.group(2))
+    else:
+        number = None
+        name = re.sub(r'-\d+x\d+', '', stem)
+    return number, name.capitalize()
+
+
+def card_sort_key(card):
+    # Numbered cards first in numeric order, then anything without a number
+    if card.number is None:
+        return (float('inf'), card.name.lower())
+    return (card.number, card.name.lower())
+
+
+def card_id_for(set_id, filename, number, name, shared_numbers=()):
+    # '<set>-<number>', or '<set>-<number>-<name>' for numbers the set declares as
+    # shared by several images, so an ID only depends on the filename and card_sets.json
+    if number is None:
+        return f"{set_id}-{filename.split('.')[0]}"
+    if number in shared_numbers:
+        return f"{set_id}-{number}-{name.lower()}"
+    return f"{set_id}-{number}"
+
+
+class CardCatalog:
+    # Index of every card image per set, built from the set definitions in
+    # sets_path and persisted in index_path. A set's directory is only listed
+    # again when its mtime changes, and unchanged filenames keep their parsed entry.
+    # Card IDs are derived from the filenames, never stored, so the index is only a cache.
+    def __init__(self, sets_path=DEFAULT_SETS_PATH, index_path=None):
+        self.sets_path = sets_path
+        self.base_dir = os.path.dirname(sets_path)
+        self.index_path = index_path or os.path.join(self.base_dir, '.card_index.json')
+        with open(sets_path, 'r', encoding='utf-8') as f:
+            self.sets = json.load(f)
+
+        self.cards = []
+        self.by_id = {}
+        self.set_cards = {}  # set_id -> [Card], sorted
+        self.pack_cards = {}  # (set_id, pack_id) -> [Card], sorted
+        self.missing_directories = []
+        self._index = None
+        self.refresh()
+
+    def refresh(self):
+        # Returns True if any set directory changed since the last refresh
+        if self._index is None:
+            self._index = self._read_index()
+
+        changed = False
+        self.missing_directories = []
+        for set_id, set_info in self.sets.items():
+            directory = os.path.join(self.base_dir, set_info['directory'])
+            cached = self._index['sets'].get(set_id)
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self.missing_directories.append(directory)
+                if cached is not None:
+                    del self._index['sets'][set_id]
+                    changed = True
+                continue
+
+            if cached is not None and cached['directory'] == directory and cached['mtime_ns'] == mtime_ns:
+                continue
+
+            old_files = cached['files'] if cached is not None and cached['directory'] == directory else {}
+            files = {}
+            for filename in os.listdir(directory):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    files[filename] = old_files.get(filename) or list(parse_card_filename(filename))
+            self._index['sets'][set_id] = {'directory': directory, 'mtime_ns': mtime_ns, 'files': files}
+            changed = True
+
+        if changed or not self.cards:
+            self._build()
+        if changed:
+            self._write_index()
+        return changed
+
+    def cards_in(self, set_id, pack_id=None):
+        if pack_id is None:
+            return self.set_cards.get(set_id, [])
+        return self.pack_cards.get((set_id, pack_id), [])
+
+    def packs(self, set_id):
+        return self.sets[set_id].get('packs', {})
+
+    def _build(self):
+        self.cards = []
+        self.set_cards = {}
+        self.pack_cards = {}
+        for set_id, set_info in self.sets.items():
+            packs_by_number = {}
+            for pack_id, pack in set_info.get('packs', {}).items():
+                self.pack_cards[(set_id, pack_id)] = []
+                for number in pack['cards']:
+                    packs_by_number.setdefault(number, []).append(pack_id)
+
+            # Rarities are given as inclusive number ranges
+            rarity_by_number = {}
+            for rarity, ranges in set_info.get('rarities', {}).items():
+                for first, last in ranges:
+                    for number in range(first, last + 1):
+                        rarity_by_number[number] = rarity
+
+            entry = self._index['sets'].get(set_id)
+            files = entry['files'] if entry is not None else {}
+            shared_numbers = set(set_info.get('shared_numbers', []))
+            number_files = {}
+            for filename, (number, _) in files.items():
+                if number is not None and number not in shared_numbers:
+                    number_files.setdefault(number, []).append(filename)
+            for number, filenames in number_files.items():
+                if len(filenames) > 1:
+                    # Keep the IDs apart for now, but they change if one of the files goes away
+                    print(f"Warning: card number {number} of {set_id} is used by {', '.join(sorted(filenames))}; "
+                          f"add it to 'shared_numbers' in {self.sets_path} to give each a stable ID")
+                    shared_numbers.add(number)
+
+            cards = []
+            for filename, (number, name) in files.items():
+                card_id = card_id_for(set_id, filename, number, name, shared_numbers)
+                image_path = os.path.join(self.base_dir, set_info['directory'], filename)
+                packs = tuple(packs_by_number.get(number, ()))
+                cards.append(Card(card_id, set_id, number, name, image_path, packs, rarity_by_number.get(number)))
+            cards.sort(key=card_sort_key)
+
+            self.set_cards[set_id] = cards
+            for card in cards:
+                for pack_id in card.packs:
+                    self.pack_cards[(set_id, pack_id)].append(card)
+            self.cards.extend(cards)
+
+        self.by_id = {card.card_id: card for card in self.cards}
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        except (OSError, ValueError):
+            pass
+        return {'version': INDEX_VERSION, 'sets': {}}
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # The index is only a cache; the catalog still works without it
+            print(f"Error writing card index {self.index_path}: {e}")
@@ -0,0 +1,185 @@
+import json
+import os
+import time
+
+SNAPSHOT_VERSION = 1
+
+
+def split_card_id(card_id):
+    # 'genetic_apex-12' -> ('genetic_apex', 12); number is None for IDs with a name suffix
+    set_id, _, rest = card_id.partition('-')
+    return set_id, int(rest) if rest.isdigit() else None
+
+
+def encode_owned(owned):
+    # Per set, numbered cards become bits of a hex string and the rest are listed
+    sets = {}
+    for card_id in owned:
+        set_id, number = split_card_id(card_id)
+        entry = sets.setdefault(set_id, {'bits': 0, 'extra': []})
+        if number is None:
+            entry['extra'].append(card_id)
+        else:
+            entry['bits'] |= 1 << number
+    return {
+        set_id: {'bits': format(entry['bits'], 'x'), 'extra': sorted(entry['extra'])}
+        for set_id, entry in sorted(sets.items())
+    }
+
+
+def decode_owned(sets):
+    owned = set()
+    for set_id, entry in sets.items():
+        bits = int(entry.get('bits', '0'), 16)
+        number = 0
+        while bits:
+            if bits & 1:
+                owned.add(f"{set_id}-{number}")
+            bits >>= 1
+            number += 1
+        owned.update(entry.get('extra', []))
+    return owned
+
+
+def move_aside(path, journal_path=None):
+    # Renames an unreadable snapshot and its journal to '<name>.bad-<time>' so a fresh
+    # collection can start without losing them; returns the new paths
+    journal_path = journal_path or os.path.splitext(path)[0] + '.journal'
+    suffix = f".bad-{int(time.time())}"
+    moved = []
+    for old_path in (path, journal_path):
+        if os.path.exists(old_path):
+            os.replace(old_path, old_path + suffix)
+            moved.append(old_path + suffix)
+    return moved
+
+
+class CollectionStore:
+    # Owned cards keyed by card ID. The snapshot at `path` is rewritten atomically
+    # on compaction; every change in between is appended to a journal next to it,
+    # so a save costs O(changes) and a crash loses at most a torn last line.
+    # A read_only store never touches the files, e.g. for batch queries.
+    def __init__(self, path='collection.json', journal_path=None, compact_every=500, read_only=False):
+        self.path = path
+        self.journal_path = journal_path or os.path.splitext(path)[0] + '.journal'
+        self.compact_every = compact_every
+        self.read_only = read_only
+        self.owned = set()
+        self._journal = None
+        self._journal_entries = 0
+        self.load()
+
+    def __contains__(self, card_id):
+        return card_id in self.owned
+
+    def __len__(self):
+        return len(self.owned)
+
+    def exists(self):
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def load(self):
+        self.close()
+        self.owned = set()
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported collection version in {self.path}: {snapshot.get('version')}")
+            self.owned = decode_owned(snapshot.get('sets', {}))
+
+        # Replay the journal; a line without its newline was cut off by a crash
+        # and is truncated away so later appends start on a clean line
+        self._journal_entries = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+            complete = data[:data.rfind(b'\n') + 1]
+            for line in complete.decode('utf-8').splitlines():
+                op, card_id = line[:1], line[1:]
+                if op == '+':
+                    self.owned.add(card_id)
+                elif op == '-':
+                    self.owned.discard(card_id)
+                else:
+                    continue
+                self._journal_entries += 1
+            if len(complete) != len(data) and not self.read_only:
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(len(complete))
+
+    def set_owned(self, card_id, owned):
+        # Returns True if the card's state actually changed
+        if owned == (card_id in self.owned):
+            return False
+        if owned:
+            self.owned.add(card_id)
+        else:
+            self.owned.discard(card_id)
+
+        self._append([f"{'+' if owned else '-'}{card_id}\n"])
+        return True
+
+    def set_owned_many(self, card_ids, owned):
+        # Bulk version of set_owned with a single journal write; returns the changed IDs
+        changed = [card_id for card_id in card_ids if owned != (card_id in self.owned)]
+        if owned:
+            self.owned.update(changed)
+        else:
+            self.owned.difference_update(changed)
+        op = '+' if owned else '-'
+        self._append([f"{op}{card_id}\n" for card_id in changed])
+        return changed
+
+    def replace(self, owned):
+        # Bulk update, e.g. an import: journal only the differences
+        owned = set(owned)
+        self.set_owned_many(sorted(self.owned - owned), False)
+        self.set_owned_many(sorted(owned - self.owned), True)
+
+    def _append(self, lines):
+        if not lines:
+            return
+        if self.read_only:
+            raise ValueError(f"Collection {self.path} was opened read-only")
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(''.join(lines))
+        self._journal.flush()
+        self._journal_entries += len(lines)
+        if self._journal_entries >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        # Write a fresh snapshot, then drop the journal it now contains
+        if self.read_only:
+            raise ValueError(f"Collection {self.path} was opened read-only")
+        snapshot = {'version': SNAPSHOT_VERSION, 'sets': encode_owned(self.owned)}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        # Replaying the old journal onto the new snapshot is harmless, so a crash
+        # between the replace and the truncate loses nothing
+        self.close()
+        open(self.journal_path, 'w').close()
+        self._journal_entries = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def import_legacy(self, path, card_ids):
+        # data.txt stored one '0'/'1' line per card of the full view, in view order
+        with open(path, 'r') as f:
+            lines = f.readlines()
+        owned = set()
+        for card_id, line in zip(card_ids, lines):
+            if line.strip() == '1':
+                owned.add(card_id)
+        self.replace(self.owned | owned)
+        self.compact()
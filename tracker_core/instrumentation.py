@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Set POKESET_PROFILE=1 to log how long each phase takes while the app runs
+ENABLED = os.environ.get('POKESET_PROFILE', '') not in ('', '0')
+
+# name -> [calls, total seconds, max seconds]
+totals = {}
+
+
+def log(message):
+    if ENABLED:
+        print(f"[profile] {message}", file=sys.stderr)
+
+
+@contextmanager
+def phase(name, **details):
+    # Times the block and logs it with any details, e.g. phase('load_cards', cards=287)
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        entry = totals.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        extra = ''.join(f" {key}={value}" for key, value in details.items())
+        log(f"{name}: {elapsed * 1000:.2f} ms{extra}")
+
+
+def summary():
+    # One line per phase, slowest total first
+    lines = []
+    for name, (calls, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name}: {calls} calls, {total * 1000:.1f} ms total, {longest * 1000:.2f} ms max")
+    return lines
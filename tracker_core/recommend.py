@@ -0,0 +1,152 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+SimulationResult = namedtuple('SimulationResult', ['mean', 'std', 'median', 'p90', 'trials'])
+
+
+def _simulate_batch(seed, trials, missing, pool_sizes, slot_rates, max_packs):
+    # Event-driven simulation: within a rarity every card is equally likely, so a
+    # trial only needs its count of missing cards per rarity. Each step jumps
+    # straight to the next pack holding at least one new card (geometric wait),
+    # picks the first slot with a new card conditioned on that, and draws the
+    # remaining slots unconditionally.
+    rng = np.random.default_rng(seed)
+    slots, rarities = slot_rates.shape
+    pool_sizes = np.maximum(pool_sizes, 1)
+    rate_cumulative = np.cumsum(slot_rates, axis=1)
+    remaining = np.tile(missing, (trials, 1)).astype(np.int64)
+    packs = np.zeros(trials, dtype=np.int64)
+    active = np.flatnonzero(remaining.sum(axis=1) > 0)
+
+    while active.size:
+        m = remaining[active]
+        hit = (m / pool_sizes) @ slot_rates.T  # P(slot s holds a new card), shape (n, slots)
+        first_hit = hit.copy()
+        first_hit[:, 1:] *= np.cumprod(1 - hit[:, :-1], axis=1)
+        p_event = first_hit.sum(axis=1)
+        packs[active] += rng.geometric(np.clip(p_event, 1e-12, 1.0))
+
+        # Slot that holds the first new card, given that the pack has one
+        u = rng.random(active.size) * p_event
+        first_slot = np.minimum((u[:, None] >= np.cumsum(first_hit, axis=1)).sum(axis=1), slots - 1)
+
+        for s in range(slots):
+            # The first hit draws its rarity among the missing cards
+            rows = np.flatnonzero(first_slot == s)
+            if rows.size:
+                cumulative = np.cumsum(slot_rates[s] * (m[rows] / pool_sizes), axis=1)
+                u = rng.random(rows.size) * cumulative[:, -1]
+                rarity = np.minimum((u[:, None] >= cumulative).sum(axis=1), rarities - 1)
+                m[rows, rarity] -= 1
+
+            # Later slots draw any card and may add more new ones
+            rows = np.flatnonzero(first_slot < s)
+            if rows.size:
+                rarity = np.minimum(np.searchsorted(rate_cumulative[s], rng.random(rows.size), side='right'), rarities - 1)
+                is_new = rng.random(rows.size) * pool_sizes[rarity] < m[rows, rarity]
+                m[rows[is_new], rarity[is_new]] -= 1
+
+        remaining[active] = m
+        done = (m.sum(axis=1) == 0) | (packs[active] >= max_packs)
+        active = active[~done]
+
+    return np.minimum(packs, max_packs)
+
+
+class PackRecommender:
+    # Recommends which pack of a set to open next. A pack's pool is the cards
+    # assigned to it plus every card of the set not assigned to any pack; each
+    # slot draws a rarity from the set's pull rates, then a card uniformly within
+    # that rarity. Cards without a known rarity can't be pulled and are ignored,
+    # and a set without pull rates or rarities has nothing to recommend.
+    def __init__(self, catalog, set_id):
+        set_info = catalog.sets[set_id]
+        self.set_id = set_id
+        self.pack_ids = list(catalog.packs(set_id))
+        self.rarities = list(set_info.get('rarities', {}))
+        rarity_index = {rarity: i for i, rarity in enumerate(self.rarities)}
+
+        cards = [card for card in catalog.cards_in(set_id) if card.rarity in rarity_index]
+        self.card_ids = [card.card_id for card in cards]
+        self.card_rarity = np.array([rarity_index[card.rarity] for card in cards], dtype=np.int64)
+
+        # One-hot rarity per card, shape (cards, rarities)
+        self.rarity_onehot = np.zeros((len(cards), len(self.rarities)))
+        self.rarity_onehot[np.arange(len(cards)), self.card_rarity] = 1
+
+        # Pool membership, shape (packs, cards)
+        self.pools = np.zeros((len(self.pack_ids), len(cards)), dtype=bool)
+        for j, card in enumerate(cards):
+            for i, pack_id in enumerate(self.pack_ids):
+                self.pools[i, j] = not card.packs or pack_id in card.packs
+        self.pool_sizes = self.pools.astype(float) @ self.rarity_onehot  # (packs, rarities)
+
+        # Slot rates per pack, renormalized over the rarities its pool actually has
+        pull_rates = set_info.get('pull_rates', [])
+        self.slots = len(pull_rates)
+        self.pullable = bool(self.slots and self.card_ids)
+        rates = np.array([[slot.get(rarity, 0.0) for rarity in self.rarities] for slot in pull_rates],
+                         dtype=float).reshape(self.slots, len(self.rarities))
+        available = self.pool_sizes > 0
+        self.slot_rates = rates[None, :, :] * available[:, None, :]  # (packs, slots, rarities)
+        totals = self.slot_rates.sum(axis=2, keepdims=True)
+        self.slot_rates = np.divide(self.slot_rates, totals, out=np.zeros_like(self.slot_rates), where=totals > 0)
+
+        # P(a given card of rarity r appears in one pack), shape (packs, rarities)
+        per_card = np.divide(self.slot_rates, self.pool_sizes[:, None, :],
+                             out=np.zeros_like(self.slot_rates), where=self.pool_sizes[:, None, :] > 0)
+        self.appear_probability = 1 - np.prod(1 - per_card, axis=1)
+
+    def owned_mask(self, owned):
+        return np.fromiter((card_id in owned for card_id in self.card_ids), dtype=bool, count=len(self.card_ids))
+
+    def missing_counts(self, owned):
+        # Missing cards per pack and rarity, shape (packs, rarities)
+        missing = ~self.owned_mask(owned)
+        return (self.pools & missing).astype(float) @ self.rarity_onehot
+
+    def expected_new_cards(self, owned):
+        # Exact expected number of distinct new cards in one pack of each kind
+        expected = (self.missing_counts(owned) * self.appear_probability).sum(axis=1)
+        return dict(zip(self.pack_ids, expected.tolist()))
+
+    def best_pack(self, owned):
+        # (pack_id, expected new cards), or None if the set has no packs or pullable cards
+        expected = self.expected_new_cards(owned)
+        if not expected or not self.pullable:
+            return None
+        pack_id = max(expected, key=expected.get)
+        return pack_id, expected[pack_id]
+
+    def simulate_packs_to_completion(self, owned, trials=10000, seed=None, workers=1,
+                                     batch_size=10000, max_packs=1000000):
+        # Monte Carlo estimate of how many packs of each kind complete that pack's
+        # pool. Batches are seeded from one SeedSequence, so a fixed seed gives the
+        # same result for any number of workers. Empty without pullable cards.
+        if not self.pullable:
+            return {}
+        missing = self.missing_counts(owned).astype(np.int64)
+        batches = [min(batch_size, trials - start) for start in range(0, trials, batch_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(self.pack_ids) * len(batches))
+
+        jobs = []
+        for i in range(len(self.pack_ids)):
+            for j, size in enumerate(batches):
+                jobs.append((seeds[i * len(batches) + j], size, missing[i], self.pool_sizes[i],
+                             self.slot_rates[i], max_packs))
+
+        if workers == 1:
+            results = [_simulate_batch(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_simulate_batch, *zip(*jobs)))
+
+        summary = {}
+        for i, pack_id in enumerate(self.pack_ids):
+            packs = np.concatenate(results[i * len(batches):(i + 1) * len(batches)])
+            summary[pack_id] = SimulationResult(
+                float(packs.mean()), float(packs.std()), float(np.median(packs)),
+                float(np.percentile(packs, 90)), int(packs.size),
+            )
+        return summary
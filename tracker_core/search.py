@@ -0,0 +1,161 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+WORD_SEPARATOR = re.compile(r'[-\s]+')
+NUMBER_TOKEN = re.compile(r'#?(\d+)(?:-(\d+))?')
+
+
+def normalize_name(text):
+    # 'Charizard-ex', 'charizard ex' and 'CHARIZARD  EX' all become 'charizard ex'
+    return WORD_SEPARATOR.sub(' ', text.lower()).strip()
+
+
+def parse_search(text):
+    # Search box text -> (name terms, number ranges) for SearchIndex.query. '#12' or
+    # '#10-50' (or bare numbers) select card numbers and several of them add up; every
+    # other word must match the name, as a prefix of one of its words if it ends in '*':
+    # 'char* ex #1-20 #50' -> ([('char', True), ('ex', False)], [(1, 20), (50, 50)])
+    terms = []
+    ranges = []
+    for token in text.split():
+        match = NUMBER_TOKEN.fullmatch(token)
+        if match:
+            first = int(match.group(1))
+            last = int(match.group(2)) if match.group(2) else first
+            ranges.append((min(first, last), max(first, last)))
+        elif token.rstrip('*'):
+            terms.append((token.rstrip('*'), token.endswith('*')))
+    return terms, ranges
+
+
+def positions_to_bits(positions):
+    # Fill a byte buffer and convert once; OR-ing into a growing int is quadratic
+    positions = list(positions)
+    if not positions:
+        return 0
+    buffer = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bits_to_positions(bits):
+    # Set bits in ascending order; reading the binary string is much faster than peeling bits
+    return [i for i, digit in enumerate(reversed(bin(bits)[2:])) if digit == '1']
+
+
+class SearchIndex:
+    # In-memory filter index over a fixed, sorted list of cards (e.g. one set).
+    # Each card is a bit position; pack, rarity and ownership are bitmaps, name
+    # prefixes are looked up in a sorted word list and substrings through trigram
+    # postings, so a query never touches the disk or rebuilds card data.
+    def __init__(self, cards, owned=()):
+        self.cards = list(cards)
+        self.position = {card.card_id: i for i, card in enumerate(self.cards)}
+        self.all_bits = (1 << len(self.cards)) - 1
+        self.names = [normalize_name(card.name) for card in self.cards]
+
+        # Cards come sorted by number, so a number range is a contiguous run of bits
+        self.numbers = [card.number if card.number is not None else float('inf') for card in self.cards]
+
+        pack_positions = {}
+        rarity_positions = {}
+        for i, card in enumerate(self.cards):
+            for pack_id in card.packs:
+                pack_positions.setdefault(pack_id, []).append(i)
+            if card.rarity is not None:
+                rarity_positions.setdefault(card.rarity, []).append(i)
+        self.pack_bits = {pack_id: positions_to_bits(positions) for pack_id, positions in pack_positions.items()}
+        self.rarity_bits = {rarity: positions_to_bits(positions) for rarity, positions in rarity_positions.items()}
+
+        # Every word of every name, and the full name, sorted for prefix lookups
+        words = []
+        trigrams = {}
+        for i, name in enumerate(self.names):
+            words.append((name, i))
+            words.extend((word, i) for word in name.split(' ') if word != name)
+            for j in range(len(name) - 2):
+                trigrams.setdefault(name[j:j + 3], []).append(i)
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_positions = array('I', [i for _, i in words])
+        self.trigrams = {gram: array('I', positions) for gram, positions in trigrams.items()}
+
+        self.owned_bits = 0
+        self.set_owned_cards(owned)
+        self._name_cache = {}
+
+    def set_owned(self, card_id, owned):
+        i = self.position.get(card_id)
+        if i is None:
+            return
+        if owned:
+            self.owned_bits |= 1 << i
+        else:
+            self.owned_bits &= ~(1 << i)
+
+    def set_owned_cards(self, owned):
+        self.owned_bits = positions_to_bits(self.position[card_id] for card_id in owned if card_id in self.position)
+
+    def name_prefix_bits(self, prefix):
+        # Cards whose name, or any word of it, starts with prefix
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\uffff', start)
+        return positions_to_bits(self.word_positions[start:end])
+
+    def name_substring_bits(self, text):
+        if len(text) < 3:
+            candidates = range(len(self.names))
+        else:
+            # Start from the rarest trigram, then check the candidates directly
+            postings = [self.trigrams.get(text[j:j + 3], ()) for j in range(len(text) - 2)]
+            candidates = min(postings, key=len)
+        return positions_to_bits(i for i in candidates if text in self.names[i])
+
+    def number_range_bits(self, first=None, last=None):
+        start = 0 if first is None else bisect_left(self.numbers, first)
+        end = len(self.numbers) if last is None else bisect_right(self.numbers, last)
+        if end <= start:
+            return 0
+        return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+    def name_bits(self, text, prefix=False):
+        # Cards matching one name term, cached since typing extends a query one key at a time
+        text = normalize_name(text)
+        if not text:
+            return self.all_bits
+        key = (text, prefix)
+        bits = self._name_cache.get(key)
+        if bits is None:
+            bits = self.name_prefix_bits(text) if prefix else self.name_substring_bits(text)
+            # Keep only recent lookups
+            if len(self._name_cache) > 64:
+                self._name_cache.clear()
+            self._name_cache[key] = bits
+        return bits
+
+    def query(self, terms=(), ranges=(), owned=None, pack_id=None, rarity=None):
+        # Positions of the matching cards, in catalog order. terms are (text, prefix)
+        # pairs that must all match the name; ranges are inclusive (first, last) card
+        # numbers, any of which may match (None for an open end). owned=True/False
+        # keeps only owned/missing cards and None ignores ownership.
+        bits = self.all_bits
+        if pack_id is not None:
+            bits &= self.pack_bits.get(pack_id, 0)
+        if rarity is not None:
+            bits &= self.rarity_bits.get(rarity, 0)
+        if owned is True:
+            bits &= self.owned_bits
+        elif owned is False:
+            bits &= ~self.owned_bits
+        if ranges:
+            range_bits = 0
+            for first, last in ranges:
+                range_bits |= self.number_range_bits(first, last)
+            bits &= range_bits
+        for text, prefix in terms:
+            if not bits:
+                break
+            bits &= self.name_bits(text, prefix)
+        return bits_to_positions(bits)
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+
+
+class CompletionStats:
+    # Running owned/total counters for every set (pack None) and every pack of a
+    # set, keyed by (set_id, pack_id). A toggle touches only the counters of the
+    # groups that card belongs to; bulk changes can suspend notifications and
+    # recompute once at the end.
+    def __init__(self, catalog, owned=()):
+        self.listeners = []
+        self.total = {}
+        self.owned = {}
+        self._groups = {}  # card_id -> group keys
+        self._suspended = 0
+        self._dirty = False
+        self.reset(catalog, owned)
+
+    def reset(self, catalog, owned=()):
+        self.total = {}
+        self._groups = {}
+        for card in catalog.cards:
+            keys = ((card.set_id, None),) + tuple((card.set_id, pack_id) for pack_id in card.packs)
+            self._groups[card.card_id] = keys
+            for key in keys:
+                self.total[key] = self.total.get(key, 0) + 1
+        self.recompute(owned)
+
+    def recompute(self, owned):
+        self.owned = dict.fromkeys(self.total, 0)
+        for card_id in owned:
+            for key in self._groups.get(card_id, ()):
+                self.owned[key] += 1
+        self.notify()
+
+    def completion(self):
+        # {(set_id, pack_id): (owned, total)} for every set and pack
+        return {key: (self.owned[key], total) for key, total in self.total.items()}
+
+    def update(self, card_id, owned):
+        # Call only for actual changes, e.g. when CollectionStore.set_owned returns True
+        delta = 1 if owned else -1
+        for key in self._groups.get(card_id, ()):
+            self.owned[key] += delta
+        self.notify()
+
+    def percentage(self, set_id, pack_id=None):
+        total = self.total.get((set_id, pack_id), 0)
+        if not total:
+            return 0.0
+        return self.owned[(set_id, pack_id)] / total * 100
+
+    def notify(self):
+        if self._suspended:
+            self._dirty = True
+            return
+        for listener in self.listeners:
+            listener(self)
+
+    @contextmanager
+    def suspended(self):
+        # Listeners are called at most once, after the outermost block exits
+        self._suspended += 1
+        try:
+            yield self
+        finally:
+            self._suspended -= 1
+            if not self._suspended and self._dirty:
+                self._dirty = False
+                self.notify()
@@ -1,62 +1,267 @@
-import os
+import argparse
 import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from PIL import Image
 
-# Directory to save images
-output_dir = "../genetic_apex_images"
-os.makedirs(output_dir, exist_ok=True)
-
-# Load HAR file
-har_file = "apex.har"  # Replace with the path to your HAR file
-
-with open(har_file, 'r', encoding='utf-8') as f:
-    har_data = json.load(f)
-
-# Extract image URLs from HAR file
-image_urls = []
-for entry in har_data['log']['entries']:
-    url = entry['request']['url']
-    if url.endswith(('.png', '.jpg', '.jpeg', '.webp')):
-        image_urls.append(url)
-
-# Function to download images
-def download_images(image_urls, folder):
-    webp_images = []
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    }
-    for img_url in image_urls:
-        img_name = os.path.join(folder, os.path.basename(img_url))
-        print(f"Downloading {img_url}...")
-
-        # Download image with headers
-        response = requests.get(img_url, headers=headers)
-        
-        # Check if the request was successful
-        if response.status_code == 200:
-            with open(img_name, 'wb') as f:
-                f.write(response.content)
-            print(f"Saved to {img_name}")
-
-            # Track .webp images for conversion
-            if img_name.endswith('.webp'):
-                webp_images.append(img_name)
+# Save next to the app so it picks the cards up directly
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'genetic_apex_cards')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+MANIFEST_NAME = '.download_manifest.json'
+CHUNK_SIZE = 64 * 1024
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+
+
+# Extract image URLs from HAR file, in order and without duplicates
+def read_image_urls(har_file):
+    with open(har_file, 'r', encoding='utf-8') as f:
+        har_data = json.load(f)
+
+    image_urls = []
+    seen = set()
+    for entry in har_data['log']['entries']:
+        url = entry['request']['url']
+        if urlparse(url).path.lower().endswith(IMAGE_EXTENSIONS) and url not in seen:
+            seen.add(url)
+            image_urls.append(url)
+    return image_urls
+
+
+# One pooled session shared by all download threads, retrying transient failures with backoff
+def make_session(pool_size=8, retries=5, backoff=0.5):
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET', 'HEAD'),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_NAME)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def content_range_start(response):
+    # First byte of a 206 response, from 'Content-Range: bytes <start>-<end>/<total>'
+    value = response.headers.get('Content-Range', '')
+    try:
+        return int(value.split()[1].split('-')[0])
+    except (IndexError, ValueError):
+        return None
+
+
+# Download one image, streaming it to a .part file that is resumed if a previous run was interrupted.
+# on_response(etag) is called once the server starts sending, so the caller can keep the ETag the
+# .part belongs to. Returns (status, path, bytes transferred, etag) where status is 'downloaded',
+# 'skipped' or 'failed'.
+def download_image(session, img_url, folder, known=None, timeout=30, on_response=None):
+    known = known or {}
+    img_name = os.path.join(folder, os.path.basename(urlparse(img_url).path))
+    part_name = f"{img_name}.part"
+    headers = {}
+
+    if os.path.exists(img_name):
+        if known.get('etag'):
+            # Unchanged on the server: 304 and nothing to transfer
+            headers['If-None-Match'] = known['etag']
         else:
+            response = session.head(img_url, timeout=timeout, allow_redirects=True)
+            length = response.headers.get('Content-Length')
+            if response.ok and length is not None and int(length) == os.path.getsize(img_name):
+                return 'skipped', img_name, 0, response.headers.get('ETag')
+
+    offset = os.path.getsize(part_name) if os.path.exists(part_name) else 0
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        if known.get('part_etag'):
+            # Only resume if the file is still the one we started downloading
+            headers['If-Range'] = known['part_etag']
+            headers.pop('If-None-Match', None)
+
+    restart = False
+    with session.get(img_url, headers=headers, stream=True, timeout=timeout) as response:
+        etag = response.headers.get('ETag')
+        if response.status_code == 304:
+            return 'skipped', img_name, 0, known.get('etag')
+        if response.status_code == 416 and offset:
+            # Nothing left past the .part: it is complete if it matches the server's size
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            if total.isdigit() and int(total) == offset:
+                os.replace(part_name, img_name)
+                return 'downloaded', img_name, 0, etag or known.get('part_etag')
+            restart = True
+        elif response.status_code == 206 and content_range_start(response) != offset:
+            restart = True
+        elif response.status_code not in (200, 206):
             print(f"Failed to download {img_url}. Status code: {response.status_code}")
+            return 'failed', img_name, 0, None
+        else:
+            if on_response is not None:
+                on_response(etag)
+            # 200 means the server ignored the range (or the file changed), so start over
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            transferred = 0
+            with open(part_name, mode) as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    transferred += len(chunk)
+
+    if restart:
+        # The .part can't be continued; drop it and download the whole file
+        os.remove(part_name)
+        return download_image(session, img_url, folder, known, timeout, on_response)
+
+    os.replace(part_name, img_name)
+    return 'downloaded', img_name, transferred, etag
+
+
+# Convert .webp to .png, optionally shrinking it to fit max_size; runs in a worker process.
+# Returns None if the .png is already up to date, unless force is set (e.g. max_size changed).
+def convert_image(webp_image, max_size=None, force=False):
+    png_image = os.path.splitext(webp_image)[0] + ".png"
+    if not force and os.path.exists(png_image) and os.path.getmtime(png_image) >= os.path.getmtime(webp_image):
+        return None
+    with Image.open(webp_image) as img:
+        img = img.convert('RGBA')
+        if max_size is not None:
+            img.thumbnail(max_size, Image.LANCZOS)
+        img.save(f"{png_image}.tmp", "PNG")
+    os.replace(f"{png_image}.tmp", png_image)
+    return png_image
+
+
+# Download every URL on a thread pool and convert finished .webp files on a process pool meanwhile
+def download_images(image_urls, folder, session=None, workers=8, convert_workers=None, max_size=None):
+    os.makedirs(folder, exist_ok=True)
+    session = session or make_session(pool_size=workers)
+    manifest = load_manifest(folder)
+    summary = {'downloaded': 0, 'skipped': 0, 'failed': 0, 'converted': 0, 'bytes': 0}
+    start = time.perf_counter()
+
+    # Download threads record the ETag of each .part they start, so an interrupted
+    # run can still resume with If-Range; the manifest is saved as downloads finish
+    lock = threading.Lock()
+
+    def record_part(img_url, etag):
+        with lock:
+            manifest.setdefault(img_url, {})['part_etag'] = etag
+
+    def save():
+        with lock:
+            save_manifest(folder, manifest)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as downloads, \
+                ProcessPoolExecutor(max_workers=convert_workers) as conversions:
+            futures = {
+                downloads.submit(download_image, session, img_url, folder, manifest.get(img_url),
+                                 on_response=partial(record_part, img_url)): img_url
+                for img_url in image_urls
+            }
+            # The manifest remembers the max_size each .png was made with, so a different one reconverts
+            converted_size = list(max_size) if max_size is not None else None
+            pending_conversions = {}
+            for future in as_completed(futures):
+                img_url = futures[future]
+                try:
+                    status, img_name, transferred, etag = future.result()
+                except (requests.RequestException, OSError) as e:
+                    print(f"Failed to download {img_url}: {e}")
+                    summary['failed'] += 1
+                    continue
+
+                summary[status] += 1
+                summary['bytes'] += transferred
+                if status == 'failed':
+                    continue
+                if status == 'downloaded':
+                    print(f"Saved {img_url} to {img_name}")
+                with lock:
+                    previous = manifest.get(img_url) or {}
+                    manifest[img_url] = {'etag': etag, 'size': os.path.getsize(img_name)}
+                save()
+
+                if img_name.endswith('.webp'):
+                    force = previous.get('max_size') != converted_size
+                    pending_conversions[conversions.submit(convert_image, img_name, max_size, force)] = img_url
+
+            for future in as_completed(pending_conversions):
+                img_url = pending_conversions[future]
+                try:
+                    png_image = future.result()
+                    if png_image is not None:
+                        print(f"Converted to {png_image}")
+                        summary['converted'] += 1
+                    with lock:
+                        manifest[img_url]['max_size'] = converted_size
+                except Exception as e:
+                    print(f"Error converting image: {e}")
+    finally:
+        # Also on Ctrl-C or an unexpected error, so finished and partial downloads are remembered
+        save()
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def print_summary(summary):
+    seconds = max(summary['seconds'], 1e-9)
+    megabytes = summary['bytes'] / (1024 * 1024)
+    print(f"{summary['downloaded']} downloaded, {summary['skipped']} unchanged, {summary['failed']} failed, "
+          f"{summary['converted']} converted")
+    print(f"{megabytes:.2f} MB in {seconds:.2f}s ({megabytes / seconds:.2f} MB/s, "
+          f"{summary['downloaded'] / seconds:.1f} files/s)")
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
 
-    return webp_images
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download card images listed in a HAR file.")
+    parser.add_argument('har_file', nargs='?', default='apex.har', help="HAR file to read image URLs from")
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR, help="directory to save images to")
+    parser.add_argument('-j', '--workers', type=int, default=8, help="concurrent downloads")
+    parser.add_argument('--convert-workers', type=int, default=None, help="processes converting .webp to .png")
+    parser.add_argument('--max-size', type=parse_size, default=None, help="shrink converted images to fit, e.g. 301x420")
+    args = parser.parse_args(argv)
 
-# Convert .webp to .png
-def convert_webp_to_png(webp_images, folder):
-    for webp_image in webp_images:
-        png_image = os.path.splitext(webp_image)[0] + ".png"
-        img = Image.open(webp_image)
-        img.save(png_image, "PNG")
-        print(f"Converted {webp_image} to {png_image}")
+    image_urls = read_image_urls(args.har_file)
+    summary = download_images(image_urls, args.output_dir, workers=args.workers,
+                              convert_workers=args.convert_workers, max_size=args.max_size)
+    print_summary(summary)
+    return 1 if summary['failed'] else 0
 
-# Download images
-webp_images = download_images(image_urls, output_dir)
 
-# Convert .webp images to .png
-convert_webp_to_png(webp_images, output_dir)
+if __name__ == '__main__':
+    sys.exit(main())